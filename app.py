@@ -11,13 +11,13 @@ import paho.mqtt.subscribe as subscribe
 import random
 import sys
 import time
-from typing import Any, Callable, Coroutine
+from typing import Any, Callable, Coroutine, Optional
 import psutil
 import signal
 
 import cubes_to_game
-from dictionary import Dictionary
-from pygameasync import events
+from dictionary import Dictionary, Difficulty
+from pygameasync import EventEngine, events
 import tiles
 from scorecard import ScoreCard
 
@@ -37,29 +37,35 @@ SCRABBLE_LETTER_SCORES = {
 }
 
 class App:
-    def __init__(self, publish_queue: asyncio.Queue, dictionary: Dictionary) -> None:
+    def __init__(self, publish_queue: asyncio.Queue, dictionary: Dictionary,
+        cubes: cubes_to_game.CubeSession, difficulty: Optional[Difficulty] = None,
+        event_engine: EventEngine = events) -> None:
         def make_guess_tiles_callback(the_app: App) -> Callable[[list[str], bool],  Coroutine[Any, Any, None]]:
             async def guess_tiles_callback(guess: list[str], move_tiles: bool) -> None:
                 await the_app.guess_tiles(guess, move_tiles)
             return guess_tiles_callback
 
         self._dictionary = dictionary
+        self._cubes = cubes
+        self._events = event_engine
+        self._difficulty = difficulty
         self._publish_queue = publish_queue
         self._last_guess: list[str] = []
         self._player_rack = tiles.Rack('?' * tiles.MAX_LETTERS)
         self._score_card = ScoreCard(self._player_rack, self._dictionary)
-        cubes_to_game.set_guess_tiles_callback(make_guess_tiles_callback(self))
+        self._cubes.set_guess_tiles_callback(make_guess_tiles_callback(self))
         self._running = False
 
     async def start(self) -> None:
-        self._player_rack = self._dictionary.get_rack()
+        self._player_rack = self._dictionary.get_rack(self._difficulty)
         self._update_next_tile(self._player_rack.next_letter())
         self._score_card = ScoreCard(self._player_rack, self._dictionary)
+        self._cubes.invalidate_cube_state()
         await self.load_rack()
         self._update_rack_display(0, 0)
         self._update_previous_guesses()
         self._update_remaining_previous_guesses()
-        await cubes_to_game.guess_last_tiles(self._publish_queue)
+        await self._cubes.guess_last_tiles(self._publish_queue)
         self._running = True
 
     async def stop(self) -> None:
@@ -68,24 +74,26 @@ class App:
         self._running = False
 
     async def load_rack(self) -> None:
-        await cubes_to_game.load_rack(self._publish_queue, self._player_rack.get_tiles())
+        await self._cubes.load_rack(self._publish_queue, self._player_rack.get_tiles())
 
     async def accept_new_letter(self, next_letter: str, position: int) -> None:
+        old_letter = self._player_rack.get_tiles()[position].letter
         changed_tile = self._player_rack.replace_letter(next_letter, position)
 
-        self._score_card.update_previous_guesses()
-        await cubes_to_game.accept_new_letter(self._publish_queue, next_letter, changed_tile.id)
+        newly_possible, newly_impossible = self._score_card.update_previous_guesses(old_letter, next_letter)
+        await self._cubes.accept_new_letter(self._publish_queue, next_letter, changed_tile.id)
 
-        self._update_previous_guesses()
-        self._update_remaining_previous_guesses()
-        events.trigger("rack.update_letter", changed_tile, position)
+        if newly_possible or newly_impossible:
+            self._update_previous_guesses()
+            self._update_remaining_previous_guesses()
+        self._events.trigger("rack.update_letter", changed_tile, position)
         self._update_next_tile(self._player_rack.next_letter())
         if changed_tile.id in self._last_guess:
             await self.guess_tiles(self._last_guess, False)
 
     def add_guess(self, guess: str) -> None:
         self._score_card.add_guess(guess)
-        events.trigger("input.add_guess",
+        self._events.trigger("input.add_guess",
             self._score_card.get_previous_guesses(), guess)
 
         self._update_previous_guesses()
@@ -109,36 +117,36 @@ class App:
             tiles_dirty = True
 
         if self._score_card.is_old_guess(guess):
-            events.trigger("game.old_guess", guess)
-            await cubes_to_game.old_guess(self._publish_queue, word_tile_ids)
+            self._events.trigger("game.old_guess", guess)
+            await self._cubes.old_guess(self._publish_queue, word_tile_ids)
             tiles_dirty = True
         elif self._score_card.is_good_guess(guess):
-            await cubes_to_game.good_guess(self._publish_queue, word_tile_ids)
+            await self._cubes.good_guess(self._publish_queue, word_tile_ids)
             self._score_card.add_staged_guess(guess)
-            events.trigger("game.stage_guess", self._score_card.calculate_score(guess), guess)
+            self._events.trigger("game.stage_guess", self._score_card.calculate_score(guess), guess)
             good_guess_highlight = len(guess_tiles)
             tiles_dirty = True
         else:
-            events.trigger("game.bad_guess")
-            await cubes_to_game.bad_guess(self._publish_queue, word_tile_ids)
+            self._events.trigger("game.bad_guess")
+            await self._cubes.bad_guess(self._publish_queue, word_tile_ids)
 
         if tiles_dirty:
             self._update_rack_display(good_guess_highlight, len(guess))
 
     async def guess_word_keyboard(self, guess: str) -> None:
-        await cubes_to_game.guess_tiles(self._publish_queue,
+        await self._cubes.guess_tiles(self._publish_queue,
             [self._player_rack.letters_to_ids(guess)])
 
     def _update_next_tile(self, next_tile: str) -> None:
-        events.trigger("game.next_tile", next_tile)
+        self._events.trigger("game.next_tile", next_tile)
 
     def _update_previous_guesses(self) -> None:
-        events.trigger("input.update_previous_guesses",
+        self._events.trigger("input.update_previous_guesses",
             self._score_card.get_previous_guesses())
 
     def _update_remaining_previous_guesses(self) -> None:
-        events.trigger("input.remaining_previous_guesses", self._score_card.get_remaining_previous_guesses())
+        self._events.trigger("input.remaining_previous_guesses", self._score_card.get_remaining_previous_guesses())
 
     def _update_rack_display(self, highlight_length: int, guess_length: int):
-        events.trigger("rack.update_rack", self._player_rack.get_tiles(), highlight_length, guess_length)
+        self._events.trigger("rack.update_rack", self._player_rack.get_tiles(), highlight_length, guess_length)
 
@@ -28,14 +28,14 @@ class TestCubeGame(IsolatedAsyncioTestCase):
             "search", # ACEHRS
             "online"
         ]))
-        cubes_to_game.TAGS_TO_CUBES = {
+        self.session = cubes_to_game.CubeSession({
             "TAG_0": "BLOCK_0",
             "TAG_1": "BLOCK_1",
             "TAG_2": "BLOCK_2",
             "TAG_3": "BLOCK_3",
             "TAG_4": "BLOCK_4",
             "TAG_5": "BLOCK_5",
-        }
+        })
         random.seed(1)
         events.on("game.bad_guess")(nop)
         events.on("game.next_tile")(nop)
@@ -46,8 +46,7 @@ class TestCubeGame(IsolatedAsyncioTestCase):
         events.on("input.update_previous_guesses")(nop)
         a_dictionary = dictionary.Dictionary(3, 6, my_open)
         a_dictionary.read("sowpods.txt", "bingos.txt")
-        self.app = app.App(self.publish_queue, a_dictionary)
-        cubes_to_game.initialize_arrays()
+        self.app = app.App(self.publish_queue, a_dictionary, self.session)
         await self.app.start()
 
     async def test_accept_new_letter_bingo(self) -> None:
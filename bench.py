@@ -0,0 +1,287 @@
+#! /usr/bin/env python
+
+# Micro-benchmarks for the hot paths. Run e.g. `python bench.py dictionary`.
+
+import argparse
+import os
+import random
+import time
+import timeit
+import tracemalloc
+from typing import Callable
+
+import tiles
+
+def per_call_us(f: Callable[[], object], number: int) -> float:
+    return timeit.timeit(f, number=number) * 1e6 / number
+
+def bench_dictionary(args: argparse.Namespace) -> None:
+    import dictionary
+
+    with open(args.sowpods) as f:
+        sample = [w.strip().upper() for w in f if tiles.MIN_LETTERS <= len(w.strip()) <= tiles.MAX_LETTERS]
+    random.seed(0)
+    hits = random.sample(sample, 1000)
+    misses = [w[:-1] + "Q" for w in hits]
+    prefixes = [w[:3] for w in hits]
+    with open(args.bingos) as f:
+        racks = [line.strip().upper() for line in f if line.strip()][:200]
+
+    print(f"{'store':10}{'load ms':>10}{'memory KB':>12}{'is_word us':>12}{'miss us':>10}{'prefix us':>11}{'rack us':>10}")
+    for word_store in dictionary.WORD_STORES:
+        start = time.perf_counter()
+        d = dictionary.Dictionary(tiles.MIN_LETTERS, tiles.MAX_LETTERS, word_store=word_store)
+        d.read(args.sowpods, args.bingos)
+        load_ms = (time.perf_counter() - start) * 1000
+
+        # Load again under tracemalloc, which is too slow to time with.
+        del d
+        tracemalloc.start()
+        d = dictionary.Dictionary(tiles.MIN_LETTERS, tiles.MAX_LETTERS, word_store=word_store)
+        d.read(args.sowpods, args.bingos)
+        memory_kb = tracemalloc.get_traced_memory()[0] / 1024
+        tracemalloc.stop()
+        if word_store == "compiled":
+            # The mapped file lives in the page cache, not the Python heap.
+            memory_kb += os.path.getsize(dictionary.compiled_path(args.sowpods)) / 1024
+
+        it = iter(hits * 100)
+        hit_us = per_call_us(lambda: d.is_word(next(it)), 10000)
+        it = iter(misses * 100)
+        miss_us = per_call_us(lambda: d.is_word(next(it)), 10000)
+        it = iter(prefixes * 100)
+        prefix_us = per_call_us(lambda: d.is_prefix(next(it)), 10000)
+        it = iter(racks * 100)
+        rack_us = per_call_us(lambda: d.words_for_rack(next(it)), 1000)
+        print(f"{word_store:10}{load_ms:10.1f}{memory_kb:12.0f}{hit_us:12.2f}{miss_us:10.2f}{prefix_us:11.2f}{rack_us:10.1f}")
+
+def _legacy_letters_to_ids(rack: tiles.Rack, letters: str) -> list[str]:
+    ids: list[str]  = []
+    rack_tiles = rack._tiles.copy()
+    for letter in letters:
+        for tile in rack_tiles:
+            if tile.letter == letter:
+                rack_tiles.remove(tile)
+                ids += tile.id
+                break
+    return ids
+
+def _legacy_ids_to_tiles(rack: tiles.Rack, ids: list[str]) -> list[tiles.Tile]:
+    rack_tiles = []
+    for an_id in ids:
+        rack_tiles.append(next(t for t in rack._tiles if t.id == an_id))
+    return rack_tiles
+
+def _legacy_guess(rack: tiles.Rack, guess: str) -> None:
+    rack._last_guess = []
+    unused_tiles = list(rack._tiles)
+    for guess_letter in list(guess):
+        for tile in unused_tiles:
+            if guess_letter == tile.letter:
+                rack._last_guess.append(tile)
+                unused_tiles.remove(tile)
+                break
+
+def bench_tiles(args: argparse.Namespace) -> None:
+    # One fake_tile_sequences.py message (default every 10ms) costs App.guess_tiles
+    # an ids_to_letters plus an ids_to_tiles; keyboard and scoring add the rest.
+    rack = tiles.Rack("SEARCH")
+    random.seed(0)
+    guesses = ["".join(random.sample("012345", random.randint(2, 6))) for _ in range(1000)]
+    letters = [rack.ids_to_letters(list(g)) for g in guesses]
+
+    def legacy_event(ids: list[str], word: str) -> None:
+        ''.join([t.letter for t in _legacy_ids_to_tiles(rack, ids)])
+        _legacy_ids_to_tiles(rack, ids)
+        _legacy_letters_to_ids(rack, word)
+        _legacy_guess(rack, word)
+
+    def indexed_event(ids: list[str], word: str) -> None:
+        rack.ids_to_letters(ids)
+        rack.ids_to_tiles(ids)
+        rack.letters_to_ids(word)
+        rack.guess(word)
+
+    budget_us = args.duration * 1e6
+    for name, event in [("legacy", legacy_event), ("indexed", indexed_event)]:
+        it = iter(list(zip(guesses, letters)) * 100)
+        def one_event() -> None:
+            ids, word = next(it)
+            event(list(ids), word)
+        us = per_call_us(one_event, 50000)
+        print(f"{name:8}{us:8.2f} us/event  {100*us/budget_us:6.3f}% of a {args.duration*1000:g}ms message interval")
+
+def bench_events(args: argparse.Namespace) -> None:
+    import asyncio
+    from pygameasync import EventEngine
+
+    # A cube guess fires about four events: rack.update_rack and game.bad_guess
+    # (plain handlers in pygamegameasync), input.* (async handlers).
+    async def run(batched: bool) -> EventEngine:
+        events = EventEngine(batched=batched)
+        async def async_handler(*a) -> None:
+            pass
+        def sync_handler(*a) -> None:
+            pass
+        events.on("rack.update_rack")(sync_handler)
+        events.on("game.bad_guess")(sync_handler)
+        events.on("input.update_previous_guesses")(async_handler)
+        events.on("input.remaining_previous_guesses")(async_handler)
+        for _ in range(args.guesses):
+            events.trigger("rack.update_rack", [], 0, 0)
+            events.trigger("game.bad_guess")
+            events.trigger("input.update_previous_guesses", [])
+            events.trigger("input.remaining_previous_guesses", [])
+            await asyncio.sleep(0)
+        while len(asyncio.all_tasks()) > 1:
+            await asyncio.sleep(0)
+        return events
+
+    for batched in [False, True]:
+        events = asyncio.run(run(batched))
+        print(f"{'batched' if batched else 'per-event task':15}{events.stats.events_per_second():10.0f} events/s"
+            f"{events.stats.mean_latency_ms()*1000:10.1f} us mean latency"
+            f"{events.stats.max_latency_s*1e6:10.1f} us max")
+
+def bench_router(args: argparse.Namespace) -> None:
+    import aiomqtt
+    import asyncio
+    import logging
+    from topic_router import TopicRouter
+
+    # fake_tile_sequences.py: a random cube reporting a random neighbor tag, or none.
+    with open(args.cubes) as f:
+        cube_ids = [line.strip() for line in f]
+    with open(args.tags) as f:
+        tag_ids = [line.strip() for line in f] + [""]
+    random.seed(0)
+
+    class Message:
+        def __init__(self, topic: str, payload: bytes) -> None:
+            self.topic = aiomqtt.Topic(topic)
+            self.payload = payload
+    messages = [Message(f"cube/nfc/{random.choice(cube_ids)}", random.choice(tag_ids).encode())
+        for _ in range(1000)]
+    # Other topic families a server might subscribe to.
+    families = [f"family{ix}/+/state" for ix in range(args.families)]
+    logger = logging.getLogger("bench")
+
+    async def nop(*a) -> None:
+        pass
+
+    async def legacy(message: Message) -> None:
+        # main.trigger_events_from_mqtt plus BlockWordsPygame.handle_mqtt_message.
+        logger.info(f"trigger_events_from_mqtt incoming message topic: {message.topic} {message.payload!r}")
+        if message.topic.matches("cube/nfc/#"):
+            cube_id = str(message.topic).split('/')[2]
+            await nop(message, cube_id)
+        else:
+            for family in families:
+                if message.topic.matches(family):
+                    await nop(message)
+            if message.topic.matches("app/start"):
+                await nop()
+            elif message.topic.matches("app/abort"):
+                await nop()
+
+    topics = TopicRouter()
+    topics.add("cube/nfc/+", nop)
+    topics.add("app/start", nop)
+    topics.add("app/abort", nop)
+    for family in families:
+        topics.add(family, nop)
+
+    async def routed(message: Message) -> None:
+        logger.info("trigger_events_from_mqtt incoming message topic: %s %r", message.topic, message.payload)
+        await topics.dispatch(message)
+
+    async def run(dispatch: Callable) -> float:
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for message in messages:
+                await dispatch(message)
+        return (time.perf_counter() - start) * 1e6 / (args.rounds * len(messages))
+
+    for name, dispatch in [("legacy", legacy), ("router", routed)]:
+        print(f"{name:8}{asyncio.run(run(dispatch)):8.2f} us/message")
+
+def bench_frames(args: argparse.Namespace) -> None:
+    import asyncio
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    import app
+    import cubes_to_game
+    import dictionary
+    import pygamegameasync
+
+    # Game frames as BlockWordsPygame.main renders them, without the panel
+    # (hub75.update) and the tick sleep.
+    pygame.init()
+    pygame.mixer.init()
+    d = dictionary.Dictionary(tiles.MIN_LETTERS, tiles.MAX_LETTERS)
+    d.read(args.sowpods, args.bingos)
+    with open(args.sowpods) as f:
+        guesses = [w.strip().upper() for w in f if len(w.strip()) == 4][:args.guesses]
+
+    async def run(dirty_rects: bool) -> list[pygamegameasync.FrameStats]:
+        block_words = pygamegameasync.BlockWordsPygame(dirty_rects)
+        the_app = app.App(asyncio.Queue(), d, cubes_to_game.CubeSession.from_files(args.cubes, args.tags))
+        game = pygamegameasync.Game(the_app, block_words.letter_font)
+        screen = pygame.Surface((pygamegameasync.SCREEN_WIDTH, pygamegameasync.SCREEN_HEIGHT))
+        await game.start()
+        await game.update_previous_guesses(guesses)
+        stats = []
+        for running in [True, False]:
+            if not running:
+                await game.stop()
+            block_words.frame_stats = pygamegameasync.FrameStats()
+            for _ in range(args.frames):
+                await block_words.render(game, screen)
+                await asyncio.sleep(1/pygamegameasync.TICKS_PER_SECOND)
+            stats.append(block_words.frame_stats)
+        return stats
+
+    for dirty_rects in [False, True]:
+        running, idle = asyncio.run(run(dirty_rects))
+        print(f"{'dirty rects' if dirty_rects else 'full frame':12}"
+            f"{running.mean_ms():8.3f} ms/frame running ({running.idle_frames} idle)"
+            f"{idle.mean_ms():8.3f} ms/frame game over ({idle.idle_frames} idle)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Hot path micro-benchmarks")
+    subparsers = parser.add_subparsers(required=True)
+
+    dictionary_parser = subparsers.add_parser("dictionary", help="word store memory and lookup latency")
+    dictionary_parser.add_argument("--sowpods", default="sowpods.txt")
+    dictionary_parser.add_argument("--bingos", default="bingos.txt")
+    dictionary_parser.set_defaults(func=bench_dictionary)
+
+    tiles_parser = subparsers.add_parser("tiles", help="Rack lookups per cube NFC event")
+    tiles_parser.add_argument("--duration", type=float, default=0.01,
+        help="fake_tile_sequences.py message interval in seconds (default: 0.01)")
+    tiles_parser.set_defaults(func=bench_tiles)
+
+    events_parser = subparsers.add_parser("events", help="EventEngine dispatch rate and latency")
+    events_parser.add_argument("--guesses", type=int, default=20000)
+    events_parser.set_defaults(func=bench_events)
+
+    router_parser = subparsers.add_parser("router", help="MQTT topic dispatch per fake_tile_sequences.py message")
+    router_parser.add_argument("--cubes", default="cube_ids.txt")
+    router_parser.add_argument("--tags", default="tag_ids.txt")
+    router_parser.add_argument("--families", type=int, default=0,
+        help="extra topic filters to register (default: 0)")
+    router_parser.add_argument("--rounds", type=int, default=50)
+    router_parser.set_defaults(func=bench_router)
+
+    frames_parser = subparsers.add_parser("frames", help="pygame frame time, full frame vs dirty rectangles")
+    frames_parser.add_argument("--sowpods", default="sowpods.txt")
+    frames_parser.add_argument("--bingos", default="bingos.txt")
+    frames_parser.add_argument("--cubes", default="cube_ids.txt")
+    frames_parser.add_argument("--tags", default="tag_ids.txt")
+    frames_parser.add_argument("--guesses", type=int, default=20)
+    frames_parser.add_argument("--frames", type=int, default=300)
+    frames_parser.set_defaults(func=bench_frames)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -0,0 +1,155 @@
+import bisect
+import hashlib
+import logging
+import mmap
+import os
+import struct
+from typing import Callable, Iterable, Iterator, Optional
+
+# On-disk layout, all little-endian:
+#   header:  magic, version, sha256 of the source text, min_letters, max_letters
+#   buckets: (word count, byte offset) for each length min_letters..max_letters
+# Each bucket holds `count` sorted words of exactly `length` bytes, followed by
+# `count` records of signature+word (2*length bytes) sorted by signature, so both
+# is_word and anagram queries are binary searches over the mapped file.
+
+MAGIC = b"HWRD"
+VERSION = 1
+_HEADER = struct.Struct("<4sH32sBB")
+_BUCKET = struct.Struct("<II")
+
+def source_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode()).digest()
+
+def _signature(word: str) -> str:
+    return "".join(sorted(word))
+
+class _Records:
+    # Read-only sequence of fixed-width keys in the mapped file, for bisect.
+    def __init__(self, buf: mmap.mmap, offset: int, count: int, width: int, key_width: int) -> None:
+        self._buf = buf
+        self._offset = offset
+        self._count = count
+        self._width = width
+        self._key_width = key_width
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, ix: int) -> bytes:
+        start = self._offset + ix*self._width
+        return self._buf[start:start + self._key_width]
+
+class CompiledWords:
+    def __init__(self, path: str) -> None:
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.source_hash, self.min_letters, self.max_letters = _HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a compiled word list (version {VERSION})")
+
+        self._buckets: dict[int, tuple[int, int]] = {}
+        # Word ids follow file order: by length, then alphabetically.
+        self._first_ids: dict[int, int] = {}
+        first_id = 0
+        for ix, length in enumerate(range(self.min_letters, self.max_letters + 1)):
+            self._buckets[length] = _BUCKET.unpack_from(self._mmap, _HEADER.size + ix*_BUCKET.size)
+            self._first_ids[length] = first_id
+            first_id += self._buckets[length][0]
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def __len__(self) -> int:
+        return sum(count for count, _ in self._buckets.values())
+
+    def __iter__(self) -> Iterator[str]:
+        for length, (count, offset) in self._buckets.items():
+            for ix in range(count):
+                start = offset + ix*length
+                yield self._mmap[start:start + length].decode("ascii")
+
+    def __contains__(self, word: object) -> bool:
+        return isinstance(word, str) and self.word_id(word) >= 0
+
+    def word_id(self, word: str) -> int:
+        if len(word) not in self._buckets or not word.isascii():
+            return -1
+        length = len(word)
+        count, offset = self._buckets[length]
+        key = word.encode("ascii")
+        words = _Records(self._mmap, offset, count, length, length)
+        ix = bisect.bisect_left(words, key)
+        return self._first_ids[length] + ix if ix < count and words[ix] == key else -1
+
+    def has_prefix(self, prefix: str) -> bool:
+        if not prefix.isascii():
+            return False
+        key = prefix.encode("ascii")
+        for length, (count, offset) in self._buckets.items():
+            if length < len(key):
+                continue
+            # Words sorted in full are also sorted by their first len(key) bytes.
+            prefixes = _Records(self._mmap, offset, count, length, len(key))
+            ix = bisect.bisect_left(prefixes, key)
+            if ix < count and prefixes[ix] == key:
+                return True
+        return False
+
+    def words_for_signature(self, signature: str) -> list[str]:
+        length = len(signature)
+        if length not in self._buckets or not signature.isascii():
+            return []
+        count, offset = self._buckets[length]
+        anagram_offset = offset + count*length
+        key = signature.encode("ascii")
+        signatures = _Records(self._mmap, anagram_offset, count, 2*length, length)
+        words = []
+        ix = bisect.bisect_left(signatures, key)
+        while ix < count and signatures[ix] == key:
+            start = anagram_offset + ix*2*length + length
+            words.append(self._mmap[start:start + length].decode("ascii"))
+            ix += 1
+        return words
+
+def compile_words(words: Iterable[str], path: str, digest: bytes, min_letters: int, max_letters: int) -> None:
+    by_length: dict[int, set[str]] = {length: set() for length in range(min_letters, max_letters + 1)}
+    for word in words:
+        by_length[len(word)].add(word)
+
+    offset = _HEADER.size + _BUCKET.size*len(by_length)
+    header = [_HEADER.pack(MAGIC, VERSION, digest, min_letters, max_letters)]
+    body = []
+    for length, bucket in by_length.items():
+        header.append(_BUCKET.pack(len(bucket), offset))
+        sorted_words = sorted(bucket)
+        body.append("".join(sorted_words).encode("ascii"))
+        body.append("".join(sorted(_signature(w) + w for w in sorted_words)).encode("ascii"))
+        offset += 3*length*len(bucket)
+
+    # Write to a temporary file and rename so a crash never leaves a torn cache.
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(b"".join(header + body))
+    os.replace(tmp_path, path)
+
+def load(path: str, source_text: str, min_letters: int, max_letters: int,
+    read_words: Callable[[], Iterable[str]]) -> CompiledWords:
+    # Returns the compiled words at path, rebuilding it from read_words() first
+    # if it is missing or was built from different source text or limits.
+    digest = source_hash(source_text)
+    compiled: Optional[CompiledWords] = None
+    try:
+        compiled = CompiledWords(path)
+    except (OSError, ValueError, struct.error) as e:
+        logging.info(f"compiled_words: can't use {path}: {e}")
+
+    if compiled is not None:
+        if (compiled.source_hash, compiled.min_letters, compiled.max_letters) == (digest, min_letters, max_letters):
+            return compiled
+        compiled.close()
+
+    logging.info(f"compiled_words: rebuilding {path}")
+    compile_words(read_words(), path, digest, min_letters, max_letters)
+    return CompiledWords(path)
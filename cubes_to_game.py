@@ -9,251 +9,439 @@ import re
 import requests
 import sys
 import time
-from typing import Callable, Coroutine, Dict, List, Optional
+from typing import Callable, Coroutine, Dict, List, Optional, Set
 
 import tiles
 # "Tags" are nfc ids
 # "Cubes" are the MAC address of the ESP32
 # "Tiles" are the tile number assigned by the app (usually 0-6)
 
-TAGS_TO_CUBES : Dict[str, str] = {}
-
-# Linked list of cubes which are adjacent to each other, left-to-right
-cube_chain : Dict[str, str] = {}
-
-cubes_to_letters : Dict[str, str] = {}
-tiles_to_cubes : Dict[str, str] = {}
-cubes_to_tileid : Dict[str, str] = {}
-cubes_to_neighbortags : Dict[str, str] = {}
 # logging.basicConfig(stream=sys.stdout, level=logging.INFO)
 
-def find_unmatched_cubes():
-    sources = set(cube_chain.keys())
-    targets = set(cube_chain.values())
-    return list(sources - targets)
-
-def remove_back_pointer(target_cube: str):
-    for source in cube_chain:
-        if cube_chain[source] == target_cube:
-            # print(f"removing {source}: {cubes_to_letters[source]}")
-            del cube_chain[source]
-            break
-
-def print_cube_chain():
-    if not cubes_to_letters:
-        return
-    try:
-        s = ""
-        for source in cube_chain:
-            target = cube_chain[source]
-            s += f"{source} [{cubes_to_letters[source]}] -> {target} [{cubes_to_letters[target]}]; "
-        return s
-    except Exception as e:
-        logging.error(f"print_cube_chain ERROR: {e}")
-
-def dump_cubes_to_neighbortags():
-    for cube in TAGS_TO_CUBES.values():
-        log_str = f"{cube} [{cubes_to_letters.get(cube, '')}]"
-        if cube in cubes_to_neighbortags:
-            neighbor = cubes_to_neighbortags[cube]
-            neighbor_cube = TAGS_TO_CUBES.get(neighbor, "")
-            log_str += f"-> {neighbor},{neighbor_cube}"
-            log_str += f"[{cubes_to_letters.get(neighbor_cube, '')}]"
-        logging.info(log_str)
-    logging.info("")
-
-def process_tag(sender_cube: str, tag: str) -> List[str]:
-    # Returns lists of tileids
-    cubes_to_neighbortags[sender_cube] = tag
-    dump_cubes_to_neighbortags()
-    logging.info(f"process_tag {sender_cube}: {tag}")
-    logging.info(f"process_tag0 cube_chain {cube_chain}")
-    if not tag:
-        logging.info(f"process_tag: no tag, deleting target of {sender_cube}")
-        if sender_cube in cube_chain:
-            del cube_chain[sender_cube]
-    elif tag not in TAGS_TO_CUBES:
-        logging.info(f"bad tag: {tag}")
-        if sender_cube in cube_chain:
-            del cube_chain[sender_cube]
-    else:
-        target_cube = TAGS_TO_CUBES[tag]
-        if sender_cube == target_cube:
-            # print(f"cube can't point to itself")
+# Hold-off between guesses of the same chain, in seconds.
+DEBOUNCE_S = 0.5
+
+class CubeChainGraph:
+    # Cubes adjacent to each other, left-to-right, with forward and reverse
+    # pointers so that relinking one cube only touches its own chains.
+    def __init__(self) -> None:
+        self._next: Dict[str, str] = {}
+        self._prev: Dict[str, Set[str]] = {}
+        # Cubes with a successor but no predecessor.
+        self._heads: Set[str] = set()
+        # Cubes pointed at by more than one cube; while any exist the chains
+        # share tiles and there are no words.
+        self._merges: Set[str] = set()
+        # Cached chain of cubes for each head, and which head each cube is in.
+        self._chains: Dict[str, List[str]] = {}
+        self._head_of: Dict[str, str] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._next)
+
+    def __contains__(self, cube: object) -> bool:
+        return cube in self._next
+
+    def next(self, cube: str) -> Optional[str]:
+        return self._next.get(cube)
+
+    def items(self):
+        return self._next.items()
+
+    def _forget_chain(self, cube: str) -> None:
+        head = self._head_of.get(cube, cube)
+        for c in self._chains.pop(head, []):
+            if self._head_of.get(c) == head:
+                del self._head_of[c]
+
+    def _update_head(self, cube: str) -> None:
+        if cube in self._next and not self._prev.get(cube):
+            self._heads.add(cube)
+        else:
+            self._heads.discard(cube)
+        if len(self._prev.get(cube, ())) > 1:
+            self._merges.add(cube)
+        else:
+            self._merges.discard(cube)
+
+    def unlink(self, source: str) -> None:
+        target = self._next.pop(source, None)
+        if target is None:
+            return
+        self._forget_chain(source)
+        self._prev[target].discard(source)
+        self._update_head(source)
+        self._update_head(target)
+
+    def link(self, source: str, target: str) -> None:
+        self.unlink(source)
+        self._forget_chain(source)
+        self._forget_chain(target)
+        self._next[source] = target
+        self._prev.setdefault(target, set()).add(source)
+        self._update_head(source)
+        self._update_head(target)
+
+    def has_loop(self, cube: str, max_length: int) -> bool:
+        # Whether following cube's links comes back to it or runs on too long.
+        next_cube = self._next.get(cube)
+        for _ in range(max_length):
+            if next_cube is None:
+                return False
+            if next_cube == cube:
+                return True
+            next_cube = self._next.get(next_cube)
+        return True
+
+    def _walk(self, head: str, max_length: int) -> List[str]:
+        # Stops one cube past max_length: that is enough to tell it's too long.
+        chain = [head]
+        next_cube = self._next.get(head)
+        while next_cube is not None and len(chain) <= max_length:
+            chain.append(next_cube)
+            next_cube = self._next.get(next_cube)
+        return chain
+
+    def chains(self, max_length: int) -> Optional[List[List[str]]]:
+        # Every chain ordered by head cube, or None if chains merge or one is
+        # too long. Only chains changed since the last call are walked.
+        if self._merges:
+            return None
+        chains = []
+        for head in sorted(self._heads):
+            if head not in self._chains:
+                self._chains[head] = self._walk(head, max_length)
+                for cube in self._chains[head]:
+                    self._head_of[cube] = head
+            chain = self._chains[head]
+            if len(chain) > max_length:
+                return None
+            chains.append(chain)
+        return chains
+
+class CubeStateCache:
+    # Mirrors the retained letter/border state last queued for each cube, so
+    # only changes are published. Flashes are events and never cached.
+    def __init__(self) -> None:
+        self._state: Dict[str, Dict[str, str]] = {}
+
+    def update(self, cube_id: str, attribute: str, value: str) -> bool:
+        # Returns whether value differs from the cached one.
+        cube = self._state.setdefault(cube_id, {})
+        if cube.get(attribute) == value:
+            return False
+        cube[attribute] = value
+        return True
+
+    def clear(self) -> None:
+        self._state.clear()
+
+    def items(self):
+        for cube_id, attributes in self._state.items():
+            for attribute, value in attributes.items():
+                yield cube_id, attribute, value
+
+class ChainDebouncer:
+    # Turns noisy chain readings into one guess per real change, per chain
+    # (keyed by its head tile). The first change to a quiet chain is guessed at
+    # once; later changes within hold_off_s of that guess are held back, and
+    # the latest one is guessed when the hold-off ends if it still differs.
+    def __init__(self, hold_off_s: float) -> None:
+        self.hold_off_s = hold_off_s
+        self._guessed: Dict[str, Optional[str]] = {}
+        self._guessed_s: Dict[str, float] = {}
+        # Latest reading of held-back chains; None once the chain is gone.
+        self._pending: Dict[str, Optional[str]] = {}
+
+    def _guess(self, head: str, word: Optional[str], now_s: float) -> List[str]:
+        if word == self._guessed.get(head):
             return []
+        self._guessed[head] = word
+        self._guessed_s[head] = now_s
+        return [word] if word else []
+
+    def update(self, words: List[str], now_s: float) -> List[str]:
+        # Returns the words to guess now.
+        words_by_head = {word[0]: word for word in words}
+        heads = set(words_by_head) | set(self._pending) | {
+            head for head, word in self._guessed.items() if word}
+        ready = []
+        for head in sorted(heads):
+            word = words_by_head.get(head)
+            if head in self._pending:
+                self._pending[head] = word
+            elif head in self._guessed_s and now_s - self._guessed_s[head] < self.hold_off_s:
+                if word != self._guessed.get(head):
+                    self._pending[head] = word
+            else:
+                ready += self._guess(head, word, now_s)
+        return [word for word in words if word in ready]
+
+    def next_flush_s(self) -> Optional[float]:
+        if not self._pending:
+            return None
+        return min(self._guessed_s[head] for head in self._pending) + self.hold_off_s
+
+    def flush(self, now_s: float) -> List[str]:
+        # Returns the held-back words whose hold-off has ended.
+        ready = []
+        for head in sorted(self._pending):
+            if now_s - self._guessed_s[head] >= self.hold_off_s:
+                ready += self._guess(head, self._pending.pop(head), now_s)
+        return ready
+
+class CubeSession:
+    # Everything about one table's set of cubes. Each session maps its own
+    # cubes to tile ids 0.., so several can share one game server and broker.
+    def __init__(self, tags_to_cubes: Dict[str, str], debounce_s: float = DEBOUNCE_S) -> None:
+        self.tags_to_cubes = tags_to_cubes
+        self.cube_graph = CubeChainGraph()
+        self.cube_state = CubeStateCache()
+        self.cubes_to_letters: Dict[str, str] = {}
+        self.tiles_to_cubes: Dict[str, str] = {}
+        self.cubes_to_tileid: Dict[str, str] = {}
+        self.cubes_to_neighbortags: Dict[str, str] = {}
+        self.last_tiles_with_letters: list[tiles.Tile] = []
+        self.debouncer = ChainDebouncer(debounce_s)
+        self._flush_task: Optional[asyncio.Task] = None
+        self.last_guess_tiles: List[str] = []
+        self.guess_tiles_callback: Callable[[str, bool], Coroutine[None, None, None]]
+        self.invalidate_callback: Callable[[], None] = lambda: None
+        self.initialize_arrays()
+
+    @staticmethod
+    def from_files(cubes_file: str, tags_file: str, debounce_s: float = DEBOUNCE_S) -> "CubeSession":
+        tags_to_cubes = get_tags_to_cubes(cubes_file, tags_file)
+        logging.info(f"ttc: {tags_to_cubes}")
+        return CubeSession(tags_to_cubes, debounce_s)
+
+    def cubes(self) -> List[str]:
+        return list(self.tags_to_cubes.values())
+
+    def print_cube_chain(self):
+        if not self.cubes_to_letters:
+            return
+        try:
+            s = ""
+            for source, target in self.cube_graph.items():
+                s += f"{source} [{self.cubes_to_letters[source]}] -> {target} [{self.cubes_to_letters[target]}]; "
+            return s
+        except Exception as e:
+            logging.error(f"print_cube_chain ERROR: {e}")
+
+    def dump_cubes_to_neighbortags(self):
+        if not logging.getLogger().isEnabledFor(logging.INFO):
+            return
+        for cube in self.tags_to_cubes.values():
+            log_str = f"{cube} [{self.cubes_to_letters.get(cube, '')}]"
+            if cube in self.cubes_to_neighbortags:
+                neighbor = self.cubes_to_neighbortags[cube]
+                neighbor_cube = self.tags_to_cubes.get(neighbor, "")
+                log_str += f"-> {neighbor},{neighbor_cube}"
+                log_str += f"[{self.cubes_to_letters.get(neighbor_cube, '')}]"
+            logging.info(log_str)
+        logging.info("")
+
+    def process_tag(self, sender_cube: str, tag: str) -> List[str]:
+        # Returns lists of tileids
+        self.cubes_to_neighbortags[sender_cube] = tag
+        self.dump_cubes_to_neighbortags()
+        logging.info(f"process_tag {sender_cube}: {tag}")
+        if not tag:
+            logging.info(f"process_tag: no tag, deleting target of {sender_cube}")
+            self.cube_graph.unlink(sender_cube)
+        elif tag not in self.tags_to_cubes:
+            # Includes tags of another table's cubes.
+            logging.info(f"bad tag: {tag}")
+            self.cube_graph.unlink(sender_cube)
+        else:
+            target_cube = self.tags_to_cubes[tag]
+            if sender_cube == target_cube:
+                # print(f"cube can't point to itself")
+                return []
 
-        logging.info(f"process_tag: {sender_cube} -> {target_cube}")
-        if target_cube in cube_chain.values():
-            # sender overrides existing chain--must have missed a remove message, process it now.
-            logging.info(f"override: remove back pointer for {target_cube}")
-            # might cause trouble because ordering of QOS 1 is not guaranteed
-            # https://stackoverflow.com/questions/30955110/is-message-order-preserved-in-mqtt-messages
-            # ignore the dupe and hope it works out
-            # remove_back_pointer(target_cube)
-        cube_chain[sender_cube] = TAGS_TO_CUBES[tag]
-
-    logging.info(f"process_tag1 cube_chain {cube_chain}")
-
-    # search for and remove any new loops
-    source_cube = sender_cube
-    iter_length = 0
-    while source_cube:
-        iter_length += 1
-        if iter_length > tiles.MAX_LETTERS:
-            logging.info(f"forever loop, bailing")
+            logging.info(f"process_tag: {sender_cube} -> {target_cube}")
+            # If another cube already points at target_cube we must have missed a
+            # remove message (QOS 1 doesn't guarantee ordering:
+            # https://stackoverflow.com/questions/30955110/is-message-order-preserved-in-mqtt-messages).
+            # Keep both links; there are no words until one is removed.
+            self.cube_graph.link(sender_cube, target_cube)
+
+        if self.cube_graph.has_loop(sender_cube, tiles.MAX_LETTERS):
+            logging.info(f"loop or overlong chain at {sender_cube}: {self.print_cube_chain()}")
             return []
-            raise Exception("")
-        if not source_cube in cube_chain:
-            break
-        next_cube = cube_chain[source_cube]
-        if next_cube == sender_cube:
-            logging.info(f"breaking chain {print_cube_chain()}")
+
+        logging.info(f"process_tag final cube_chain: {self.print_cube_chain()}")
+        chains = self.cube_graph.chains(tiles.MAX_LETTERS)
+        if not chains:
+            # No links at all, merged chains or a chain that is too long.
+            logging.info(f"no words: {chains}")
             return []
-            del cube_chain[source_cube]
-            logging.info(f"breaking chain done {print_cube_chain()}")
-            break
-        source_cube = next_cube
-    logging.info(f"process_tag2 cube_chain {cube_chain}")
-
-    logging.info(f"process_tag final cube_chain: {print_cube_chain()}")
-    if not cube_chain:
-        # No links at all, quit.
-        return []
-
-    all_words = []
-    source_cubes = find_unmatched_cubes()
-    for source_cube in sorted(source_cubes):
-        word_tiles = []
-        sc = source_cube
-        while sc:
-            logging.info(f"source_cube: {source_cube}")
-            word_tiles.append(cubes_to_tileid[sc])
-            if len(word_tiles) > tiles.MAX_LETTERS:
-                logging.info("infinite loop")
-                return []
-                # raise Exception("infinite loop")
-            if sc not in cube_chain:
+
+        # Tile ids are looked up now, as initialize_arrays may have changed them.
+        all_words = ["".join(self.cubes_to_tileid[cube] for cube in chain) for chain in chains]
+        logging.info(f"all_words {all_words}")
+        return all_words
+
+    def initialize_arrays(self):
+        self.tiles_to_cubes.clear()
+        self.cubes_to_tileid.clear()
+
+        cubes = self.cubes()
+        for ix in range(tiles.MAX_LETTERS+1):
+            if ix >= len(cubes):
                 break
-            sc = cube_chain[sc]
-        all_words.append("".join(word_tiles))
-    logging.info(f"all_words is {all_words}")
-    all_elements = [item for lst in all_words for item in lst]
-    if len(all_elements) != len(set(all_elements)):
-        logging.info(f"DUPES: {all_words}")
-        return []
-
-    logging.info(f"all_words {all_words}")
-    return all_words
-
-def initialize_arrays():
-    tiles_to_cubes.clear()
-    cubes_to_tileid.clear()
-
-    cubes = list(TAGS_TO_CUBES.values())
-    for ix in range(tiles.MAX_LETTERS+1):
-        if ix >= len(cubes):
-            break
-        tile_id = str(ix)
-        tiles_to_cubes[tile_id] = cubes[ix]
-        cubes_to_tileid[cubes[ix]] = tile_id
-
-async def load_rack_only(publish_queue, tiles_with_letters: list[tiles.Tile]):
-    logging.info(f"LOAD RACK tiles_with_letters: {tiles_with_letters}")
-    for tile in tiles_with_letters:
-        tile_id = tile.id
-        cube_id = tiles_to_cubes[tile_id]
-        letter = tile.letter
-        cubes_to_letters[cube_id] = letter
-        await publish_letter(publish_queue, letter, cube_id)
-    logging.info(f"LOAD RACK tiles_with_letters done: {cubes_to_letters}")
-
-async def accept_new_letter(publish_queue, letter, tile_id):
-    cube_id = tiles_to_cubes[tile_id]
-    cubes_to_letters[cube_id] = letter
-    await publish_letter(publish_queue, letter, cube_id)
-
-async def publish_letter(publish_queue, letter, cube_id):
-    await publish_queue.put((f"cube/{cube_id}/letter", letter, True))
-
-last_tiles_with_letters : list[tiles.Tile] = []
-async def load_rack(publish_queue, tiles_with_letters: list[tiles.Tile]):
-    global last_tiles_with_letters
-    await load_rack_only(publish_queue, tiles_with_letters)
-
-    if last_tiles_with_letters != tiles_with_letters:
-        # Some of the tiles changed. Make a guess, just in case one of them
-        # was in our last guess (which is overkill).
-        logging.info(f"LOAD RACK guessing")
-        await guess_last_tiles(publish_queue)
-        last_tiles_with_letters = tiles_with_letters
-
-async def guess_tiles(publish_queue, word_tiles_list):
-    global last_guess_tiles
-    last_guess_tiles = word_tiles_list
-    await guess_last_tiles(publish_queue)
-
-last_guess_time = time.time()
-last_guess_tiles: List[str] = []
-DEBOUNCE_TIME = 10
-async def guess_word_based_on_cubes(sender: str, tag: str, publish_queue):
-    global last_guess_time, last_guess_tiles
-    now = time.time()
-    word_tiles_list = process_tag(sender, tag)
-    logging.info(f"WORD_TILES: {word_tiles_list}")
-    if word_tiles_list == last_guess_tiles and now - last_guess_time < DEBOUNCE_TIME:
-        logging.info(f"debounce ignoring guess")
-        last_guess_time = now
-        return
-    last_guess_time = now
-    await guess_tiles(publish_queue, word_tiles_list)
-
-guess_tiles_callback: Callable[[str, bool], Coroutine[None, None, None]]
-
-def set_guess_tiles_callback(f):
-    global guess_tiles_callback
-    guess_tiles_callback = f
-
-def get_cubeids_from_tiles(word_tiles):
-    return [tiles_to_cubes[t] for t in word_tiles]
-
-async def guess_last_tiles(publish_queue) -> None:
-    all_tiles = set((str(i) for i in range(tiles.MAX_LETTERS)))
-    logging.info(f"guess_last_tiles last_guess_tiles {last_guess_tiles} {all_tiles}")
-    borders: List[str] = []
-    for guess in last_guess_tiles:
-        logging.info(f"guess_last_tiles: {guess}")
-        await publish_queue.put((f"cube/{tiles_to_cubes[guess[0]]}/border_line", "[", True))
-        await publish_queue.put((f"cube/{tiles_to_cubes[guess[-1]]}/border_line", ']', True))
-        all_tiles.remove(guess[0])
-        if len(guess) > 1:
-            all_tiles.remove(guess[-1])
-        for g in guess[1:-1]:
-            await publish_queue.put((f"cube/{tiles_to_cubes[g]}/border_line", '-', True))
-            all_tiles.remove(g)
-    for g in all_tiles:
-        await publish_queue.put((f"cube/{tiles_to_cubes[g]}/border_line", ' ', True))
-
-    for guess in last_guess_tiles:
-        await guess_tiles_callback(guess, True)
-
-async def good_guess(publish_queue, tiles: list[str]):
-    for t in tiles:
-        await publish_queue.put((f"cube/{tiles_to_cubes[t]}/flash", None, True))
-        await publish_queue.put((f"cube/{tiles_to_cubes[t]}/border_color", "G", True))
-
-async def old_guess(publish_queue, tiles: list[str]):
-    for t in tiles:
-        await publish_queue.put((f"cube/{tiles_to_cubes[t]}/border_color", "Y", True))
-
-async def bad_guess(publish_queue, tiles: list[str]):
-    for t in tiles:
-        await publish_queue.put((f"cube/{tiles_to_cubes[t]}/border_color", "W", True))
-
-async def process_cube_guess(publish_queue, topic: aiomqtt.Topic, data: str):
-    logging.info(f"process_cube_guess: {topic} {data}")
-    sender = topic.value.removeprefix("cube/nfc/")
-    await publish_queue.put((f"game/nfc/{sender}", data, True))
-    await guess_word_based_on_cubes(sender, data, publish_queue)
+            tile_id = str(ix)
+            self.tiles_to_cubes[tile_id] = cubes[ix]
+            self.cubes_to_tileid[cubes[ix]] = tile_id
+
+    async def load_rack_only(self, publish_queue, tiles_with_letters: list[tiles.Tile]):
+        logging.info(f"LOAD RACK tiles_with_letters: {tiles_with_letters}")
+        for tile in tiles_with_letters:
+            tile_id = tile.id
+            cube_id = self.tiles_to_cubes[tile_id]
+            letter = tile.letter
+            self.cubes_to_letters[cube_id] = letter
+            await self.publish_letter(publish_queue, letter, cube_id)
+        logging.info(f"LOAD RACK tiles_with_letters done: {self.cubes_to_letters}")
+
+    async def accept_new_letter(self, publish_queue, letter, tile_id):
+        cube_id = self.tiles_to_cubes[tile_id]
+        self.cubes_to_letters[cube_id] = letter
+        await self.publish_letter(publish_queue, letter, cube_id)
+
+    async def publish_letter(self, publish_queue, letter, cube_id):
+        await self.publish_cube_state(publish_queue, cube_id, "letter", letter)
+
+    async def publish_cube_state(self, publish_queue, cube_id: str, attribute: str, value: str) -> None:
+        if self.cube_state.update(cube_id, attribute, value):
+            await publish_queue.put((f"cube/{cube_id}/{attribute}", value, True))
+
+    def set_invalidate_callback(self, f):
+        self.invalidate_callback = f
+
+    def invalidate_cube_state(self) -> None:
+        # Forget what the cubes are showing, so the next write of every attribute
+        # is published even if unchanged (e.g. at game start).
+        self.cube_state.clear()
+        self.invalidate_callback()
+
+    async def resync(self, publish_queue) -> None:
+        # Republish everything the cubes should be showing, e.g. after reconnecting.
+        state = list(self.cube_state.items())
+        self.invalidate_cube_state()
+        for cube_id, attribute, value in state:
+            await self.publish_cube_state(publish_queue, cube_id, attribute, value)
+
+    async def load_rack(self, publish_queue, tiles_with_letters: list[tiles.Tile]):
+        await self.load_rack_only(publish_queue, tiles_with_letters)
+
+        if self.last_tiles_with_letters != tiles_with_letters:
+            # Some of the tiles changed. Make a guess, just in case one of them
+            # was in our last guess (which is overkill).
+            logging.info(f"LOAD RACK guessing")
+            await self.guess_last_tiles(publish_queue)
+            self.last_tiles_with_letters = tiles_with_letters
+
+    async def guess_tiles(self, publish_queue, word_tiles_list, changed_tiles_list=None):
+        self.last_guess_tiles = word_tiles_list
+        await self.guess_last_tiles(publish_queue, changed_tiles_list)
+
+    async def guess_word_based_on_cubes(self, sender: str, tag: str, publish_queue):
+        word_tiles_list = self.process_tag(sender, tag)
+        logging.info(f"WORD_TILES: {word_tiles_list}")
+        # Borders always follow the cubes, but each chain is guessed at most
+        # once per hold-off.
+        ready = self.debouncer.update(word_tiles_list, time.monotonic())
+        if ready or word_tiles_list != self.last_guess_tiles:
+            await self.guess_tiles(publish_queue, word_tiles_list, ready)
+        if self._flush_task is None and self.debouncer.next_flush_s() is not None:
+            self._flush_task = asyncio.create_task(self._flush_debounced(publish_queue),
+                name="debounced guesses")
+
+    async def _flush_debounced(self, publish_queue) -> None:
+        try:
+            while (flush_s := self.debouncer.next_flush_s()) is not None:
+                await asyncio.sleep(max(0, flush_s - time.monotonic()))
+                ready = self.debouncer.flush(time.monotonic())
+                if ready:
+                    logging.info(f"debounced guesses: {ready}")
+                    await self.guess_last_tiles(publish_queue, ready)
+        finally:
+            self._flush_task = None
+
+    def set_guess_tiles_callback(self, f):
+        self.guess_tiles_callback = f
+
+    def get_cubeids_from_tiles(self, word_tiles):
+        return [self.tiles_to_cubes[t] for t in word_tiles]
+
+    async def guess_last_tiles(self, publish_queue, guesses: Optional[List[str]] = None) -> None:
+        # Borders are published for every chain (only changes go out), but only
+        # guesses, if given, are scored again.
+        all_tiles = set((str(i) for i in range(tiles.MAX_LETTERS)))
+        logging.info(f"guess_last_tiles last_guess_tiles {self.last_guess_tiles} {all_tiles}")
+        for guess in self.last_guess_tiles:
+            logging.info(f"guess_last_tiles: {guess}")
+            await self.publish_cube_state(publish_queue, self.tiles_to_cubes[guess[0]], "border_line", "[")
+            await self.publish_cube_state(publish_queue, self.tiles_to_cubes[guess[-1]], "border_line", "]")
+            all_tiles.remove(guess[0])
+            if len(guess) > 1:
+                all_tiles.remove(guess[-1])
+            for g in guess[1:-1]:
+                await self.publish_cube_state(publish_queue, self.tiles_to_cubes[g], "border_line", "-")
+                all_tiles.remove(g)
+        for g in all_tiles:
+            await self.publish_cube_state(publish_queue, self.tiles_to_cubes[g], "border_line", " ")
+
+        for guess in self.last_guess_tiles if guesses is None else guesses:
+            await self.guess_tiles_callback(guess, True)
+
+    async def good_guess(self, publish_queue, tiles: list[str]):
+        for t in tiles:
+            await publish_queue.put((f"cube/{self.tiles_to_cubes[t]}/flash", None, True))
+            await self.publish_cube_state(publish_queue, self.tiles_to_cubes[t], "border_color", "G")
+
+    async def old_guess(self, publish_queue, tiles: list[str]):
+        for t in tiles:
+            await self.publish_cube_state(publish_queue, self.tiles_to_cubes[t], "border_color", "Y")
+
+    async def bad_guess(self, publish_queue, tiles: list[str]):
+        for t in tiles:
+            await self.publish_cube_state(publish_queue, self.tiles_to_cubes[t], "border_color", "W")
+
+    async def process_cube_guess(self, publish_queue, topic: aiomqtt.Topic, data: str):
+        logging.info(f"process_cube_guess: {topic} {data}")
+        sender = topic.value.removeprefix("cube/nfc/")
+        await publish_queue.put((f"game/nfc/{sender}", data, True))
+        await self.guess_word_based_on_cubes(sender, data, publish_queue)
+
+    async def handle_mqtt_message(self, publish_queue, message):
+        await self.process_cube_guess(publish_queue, message.topic, message.payload.decode())
+
+class SessionRouter:
+    # Finds the session that owns a cube in one dict lookup.
+    def __init__(self) -> None:
+        self.sessions: List[CubeSession] = []
+        self._sessions_by_cube: Dict[str, CubeSession] = {}
+
+    def add(self, session: CubeSession) -> None:
+        for cube in session.cubes():
+            if cube in self._sessions_by_cube:
+                raise ValueError(f"cube {cube} is in more than one session")
+        for cube in session.cubes():
+            self._sessions_by_cube[cube] = session
+        self.sessions.append(session)
+
+    def session_for(self, cube_id: str) -> Optional[CubeSession]:
+        return self._sessions_by_cube.get(cube_id)
+
+    async def handle_nfc(self, publish_queue, cube_id: str, message):
+        session = self._sessions_by_cube.get(cube_id)
+        if session is None:
+            logging.info("ignoring message from unknown cube %s", cube_id)
+            return
+        await session.handle_mqtt_message(publish_queue, message)
 
 def read_data(f):
     data = f.readlines()
@@ -276,13 +464,3 @@ def get_tags_to_cubes_f(cubes_f, tags_f):
 
 async def subscribe(subscribe_client):
     await subscribe_client.subscribe("cube/nfc/#")
-
-def init(cubes_file, tags_file):
-    global TAGS_TO_CUBES
-    logging.info("cubes_to_game")
-    TAGS_TO_CUBES = get_tags_to_cubes(cubes_file, tags_file)
-    logging.info(f"ttc: {TAGS_TO_CUBES}")
-    initialize_arrays()
-
-async def handle_mqtt_message(publish_queue, message):
-    await process_cube_guess(publish_queue, message.topic, message.payload.decode())
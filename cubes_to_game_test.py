@@ -4,7 +4,9 @@ import aiomqtt
 import asyncio
 import io
 import json
+import random
 from io import StringIO
+from typing import Optional
 import unittest
 
 import app
@@ -45,12 +47,8 @@ class TestCubesToGame(unittest.IsolatedAsyncioTestCase):
 
         global written
         written = []
-        rack = tiles.Rack("ABCD")
-        cubes_to_game.cubes_to_tileid["BLOCK_0"] = str(rack._tiles[0].id)
-        cubes_to_game.cubes_to_tileid["BLOCK_1"] = str(rack._tiles[1].id)
-        cubes_to_game.cubes_to_tileid["BLOCK_2"] = str(rack._tiles[2].id)
-        cubes_to_game.cubes_to_tileid["BLOCK_3"] = str(rack._tiles[3].id)
-        cubes_to_game.TAGS_TO_CUBES = {
+        tiles.MAX_LETTERS = 5
+        self.session = cubes_to_game.CubeSession({
             "TAG_0": "BLOCK_0",
             "TAG_1": "BLOCK_1",
             "TAG_2": "BLOCK_2",
@@ -58,52 +56,87 @@ class TestCubesToGame(unittest.IsolatedAsyncioTestCase):
             "TAG_4": "BLOCK_4",
             "TAG_5": "BLOCK_5",
             "TAG_6": "BLOCK_6",
-        }
-        cubes_to_game.cube_chain = {}
-        cubes_to_game.cubes_to_letters = {}
-        cubes_to_game.last_guess_tiles = []
+        })
         events.on("game.current_score")(nop)
-        tiles.MAX_LETTERS = 5
         self.client = Client([])
 
         a_dictionary = dictionary.Dictionary(3, 6, my_open)
         a_dictionary.read("sowpods.txt", "bingos.txt")
-        self.the_app = app.App(self.publish_queue, a_dictionary)
-        cubes_to_game.initialize_arrays()
+        self.the_app = app.App(self.publish_queue, a_dictionary, self.session)
 
     def test_two_chain(self):
-        self.assertEqual(["01"], cubes_to_game.process_tag("BLOCK_0", "TAG_1"))
+        self.assertEqual(["01"], self.session.process_tag("BLOCK_0", "TAG_1"))
 
     def test_multiple_chains(self):
-        cubes_to_game.cube_chain["BLOCK_0"] = "BLOCK_1"
-        self.assertEqual(['01', '23'], cubes_to_game.process_tag("BLOCK_2", "TAG_3"))
+        self.session.cube_graph.link("BLOCK_0", "BLOCK_1")
+        self.assertEqual(['01', '23'], self.session.process_tag("BLOCK_2", "TAG_3"))
 
     def test_existing_chain(self):
-        cubes_to_game.cube_chain["BLOCK_0"] = "BLOCK_1"
-        self.assertEqual(["012"], cubes_to_game.process_tag("BLOCK_1", "TAG_2"))
+        self.session.cube_graph.link("BLOCK_0", "BLOCK_1")
+        self.assertEqual(["012"], self.session.process_tag("BLOCK_1", "TAG_2"))
 
     def test_break_2_chain(self):
-        cubes_to_game.cube_chain["BLOCK_0"] = "BLOCK_1"
-        self.assertEqual([], cubes_to_game.process_tag("BLOCK_1", "TAG_0"))
+        self.session.cube_graph.link("BLOCK_0", "BLOCK_1")
+        self.assertEqual([], self.session.process_tag("BLOCK_1", "TAG_0"))
 
     def test_break_3_chain(self):
-        cubes_to_game.cube_chain["BLOCK_0"] = "BLOCK_1"
-        cubes_to_game.cube_chain["BLOCK_1"] = "BLOCK_2"
-        self.assertEqual([], cubes_to_game.process_tag("BLOCK_2", "TAG_0"))
+        self.session.cube_graph.link("BLOCK_0", "BLOCK_1")
+        self.session.cube_graph.link("BLOCK_1", "BLOCK_2")
+        self.assertEqual([], self.session.process_tag("BLOCK_2", "TAG_0"))
 
     def test_delete_link(self):
-        cubes_to_game.cube_chain["BLOCK_0"] = "BLOCK_1"
-        cubes_to_game.cube_chain["BLOCK_1"] = "BLOCK_2"
-        self.assertEqual(["12"], cubes_to_game.process_tag("BLOCK_0", ""))
+        self.session.cube_graph.link("BLOCK_0", "BLOCK_1")
+        self.session.cube_graph.link("BLOCK_1", "BLOCK_2")
+        self.assertEqual(["12"], self.session.process_tag("BLOCK_0", ""))
 
     def test_delete_link_nothing_left(self):
-        self.assertEqual([], cubes_to_game.process_tag("BLOCK_0", ""))
+        self.assertEqual([], self.session.process_tag("BLOCK_0", ""))
 
     def test_bad_tag(self):
-        self.assertEqual([], cubes_to_game.process_tag("BLOCK_0", "TAG_Z"))
+        self.assertEqual([], self.session.process_tag("BLOCK_0", "TAG_Z"))
 
     def test_sender_is_target(self):
-        self.assertEqual([], cubes_to_game.process_tag("BLOCK_0", "TAG_0"))
+        self.assertEqual([], self.session.process_tag("BLOCK_0", "TAG_0"))
+
+    def test_merged_chains(self) -> None:
+        self.session.cube_graph.link("BLOCK_0", "BLOCK_1")
+        self.assertEqual([], self.session.process_tag("BLOCK_2", "TAG_1"))
+        self.assertEqual(["21"], self.session.process_tag("BLOCK_0", ""))
+
+    def test_chain_too_long(self) -> None:
+        for ix in range(4):
+            self.session.cube_graph.link(f"BLOCK_{ix}", f"BLOCK_{ix+1}")
+        self.assertEqual([], self.session.process_tag("BLOCK_4", "TAG_5"))
+        self.assertEqual(["0123", "45"], self.session.process_tag("BLOCK_3", ""))
+
+    def test_graph_matches_rebuild(self) -> None:
+        random.seed(0)
+        graph = cubes_to_game.CubeChainGraph()
+        links: dict[str, str] = {}
+        cubes = [f"C{ix}" for ix in range(6)]
+        for _ in range(2000):
+            source = random.choice(cubes)
+            target = random.choice(cubes + [None])
+            if target in (None, source):
+                graph.unlink(source)
+                links.pop(source, None)
+            else:
+                graph.link(source, target)
+                links[source] = target
+
+            expected: Optional[list[list[str]]] = []
+            heads = set(links) - set(links.values())
+            if len(set(links.values())) < len(links):
+                expected = None
+            for head in sorted(heads):
+                chain = [head]
+                while chain[-1] in links and len(chain) <= 4:
+                    chain.append(links[chain[-1]])
+                if expected is None or len(chain) > 4:
+                    expected = None
+                    break
+                expected.append(chain)
+            self.assertEqual(expected, graph.chains(4))
 
     def test_get_tags_to_cubes(self):
         cubes_file = io.StringIO("CUBE_0000000\nCUBE_0000001\nCUBE_0000002")
@@ -116,17 +149,17 @@ class TestCubesToGame(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(expected, result)
 
     async def test_process_cube_guess(self):
-        await cubes_to_game.process_cube_guess(self.publish_queue,
+        await self.session.process_cube_guess(self.publish_queue,
             aiomqtt.Topic("cube/nfc/SENDER_ID"), "BLOCK_0:TAG_1")
         self.assertEqual([('game/nfc/SENDER_ID', 'BLOCK_0:TAG_1', True)],
             list(self.publish_queue._queue))
 
     async def test_load_rack(self):
-        cubes_to_game.cubes_to_letters = {}
+        self.session.cubes_to_letters = {}
         self.the_app._player_rack = tiles.Rack("ABCDEF")
-        cubes_to_game.initialize_arrays()
-        cubes_to_game.last_guess_tiles = ['01']
-        await cubes_to_game.load_rack(self.publish_queue,
+        self.session.initialize_arrays()
+        self.session.last_guess_tiles = ['01']
+        await self.session.load_rack(self.publish_queue,
             self.the_app._player_rack.get_tiles())
         self.assertEqual(
             [
@@ -145,19 +178,19 @@ class TestCubesToGame(unittest.IsolatedAsyncioTestCase):
             sorted(list(self.publish_queue._queue)))
 
     async def test_load_rack_only(self):
-        cubes_to_game.cubes_to_letters = {}
+        self.session.cubes_to_letters = {}
         self.the_app._player_rack = tiles.Rack("ABCDEF")
-        cubes_to_game.initialize_arrays()
+        self.session.initialize_arrays()
 
-        await cubes_to_game.load_rack_only(self.publish_queue,
+        await self.session.load_rack_only(self.publish_queue,
             self.the_app._player_rack.get_tiles())
 
         self.assertEqual(
              {'BLOCK_0': 'A', 'BLOCK_1': 'B', 'BLOCK_2': 'C', 'BLOCK_3': 'D', 'BLOCK_4': 'E', 'BLOCK_5': 'F'},
-            cubes_to_game.cubes_to_letters)
+            self.session.cubes_to_letters)
         self.assertEqual(
              {'0': 'BLOCK_0', '1': 'BLOCK_1', '2': 'BLOCK_2', '3': 'BLOCK_3', '4': 'BLOCK_4', '5': 'BLOCK_5'},
-            cubes_to_game.tiles_to_cubes)
+            self.session.tiles_to_cubes)
         self.assertEqual(
             [('cube/BLOCK_0/letter', 'A', True),
              ('cube/BLOCK_1/letter', 'B', True),
@@ -168,7 +201,7 @@ class TestCubesToGame(unittest.IsolatedAsyncioTestCase):
             list(self.publish_queue._queue))
 
     async def test_guess_word_based_on_cubes(self):
-        await cubes_to_game.guess_word_based_on_cubes("BLOCK_0", "TAG_1", self.publish_queue)
+        await self.session.guess_word_based_on_cubes("BLOCK_0", "TAG_1", self.publish_queue)
         expected = [
             ('cube/BLOCK_0/border_line', '[', True),
             ('cube/BLOCK_1/border_line', ']', True),
@@ -178,7 +211,7 @@ class TestCubesToGame(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(expected, sorted(list(self.publish_queue._queue)))
 
     async def test_guess_last_tiles(self):
-        cubes_to_game.tiles_to_cubes = {
+        self.session.tiles_to_cubes = {
             "0" : "cube_0",
             "1" : "cube_1",
             "2" : "cube_2",
@@ -186,8 +219,8 @@ class TestCubesToGame(unittest.IsolatedAsyncioTestCase):
             "4" : "cube_4",
             "5" : "cube_5",
         }
-        cubes_to_game.last_guess_tiles = ["123"]
-        await cubes_to_game.guess_last_tiles(self.publish_queue)
+        self.session.last_guess_tiles = ["123"]
+        await self.session.guess_last_tiles(self.publish_queue)
         expected = [
             ('cube/cube_0/border_line', ' ', True),
             ('cube/cube_1/border_line', '[', True),
@@ -197,12 +230,12 @@ class TestCubesToGame(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(expected, sorted(list(self.publish_queue._queue)))
 
     async def test_flash_good_words(self):
-        cubes_to_game.tiles_to_cubes = {
+        self.session.tiles_to_cubes = {
             "1" : "cube_1",
             "2" : "cube_2",
             "3" : "cube_3"
         }
-        await cubes_to_game.good_guess(self.publish_queue, list("123"))
+        await self.session.good_guess(self.publish_queue, list("123"))
         expected = [('cube/cube_1/flash', None, True),
             ('cube/cube_1/border_color', 'G', True),
             ('cube/cube_2/flash', None, True),
@@ -212,6 +245,99 @@ class TestCubesToGame(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(expected,
             list(self.publish_queue._queue))
 
+    async def test_load_rack_only_unchanged(self):
+        rack = tiles.Rack("ABCDEF")
+        await self.session.load_rack_only(self.publish_queue, rack.get_tiles())
+        self.publish_queue = asyncio.Queue()
+        rack.replace_letter("Z", 2)
+        await self.session.load_rack_only(self.publish_queue, rack.get_tiles())
+        self.assertEqual([('cube/BLOCK_2/letter', 'Z', True)], list(self.publish_queue._queue))
+
+    async def test_flash_not_cached(self):
+        for _ in range(2):
+            await self.session.good_guess(self.publish_queue, list("1"))
+        self.assertEqual([('cube/BLOCK_1/flash', None, True),
+            ('cube/BLOCK_1/border_color', 'G', True),
+            ('cube/BLOCK_1/flash', None, True)],
+            list(self.publish_queue._queue))
+
+    async def test_invalidate_cube_state(self):
+        invalidated = []
+        self.session.set_invalidate_callback(lambda: invalidated.append(True))
+        await self.session.bad_guess(self.publish_queue, list("1"))
+        self.session.invalidate_cube_state()
+        await self.session.bad_guess(self.publish_queue, list("1"))
+        self.assertEqual([('cube/BLOCK_1/border_color', 'W', True)] * 2, list(self.publish_queue._queue))
+        self.assertEqual([True], invalidated)
+
+    async def test_resync(self):
+        await self.session.publish_letter(self.publish_queue, "A", "BLOCK_0")
+        await self.session.old_guess(self.publish_queue, list("0"))
+        self.publish_queue = asyncio.Queue()
+        await self.session.resync(self.publish_queue)
+        self.assertEqual([('cube/BLOCK_0/letter', 'A', True), ('cube/BLOCK_0/border_color', 'Y', True)],
+            list(self.publish_queue._queue))
+
+    async def test_router(self):
+        other = cubes_to_game.CubeSession({f"TAG_{c}": f"BLOCK_{c}" for c in "ABCDE"})
+        router = cubes_to_game.SessionRouter()
+        router.add(self.session)
+        router.add(other)
+        self.assertIs(other, router.session_for("BLOCK_B"))
+        self.assertIsNone(router.session_for("BLOCK_Z"))
+        with self.assertRaises(ValueError):
+            router.add(cubes_to_game.CubeSession({"TAG_X": "BLOCK_A"}))
+
+        other.set_guess_tiles_callback(self.guess_tiles_callback)
+        await router.handle_nfc(self.publish_queue, "BLOCK_A", NfcMessage("cube/nfc/BLOCK_A", b"TAG_B"))
+        await router.handle_nfc(self.publish_queue, "BLOCK_Z", NfcMessage("cube/nfc/BLOCK_Z", b"TAG_B"))
+        self.assertEqual(["01"], other.last_guess_tiles)
+        self.assertEqual([], self.session.last_guess_tiles)
+        self.assertIn(("cube/BLOCK_A/border_line", "[", True), list(self.publish_queue._queue))
+
+    def test_debouncer(self) -> None:
+        debouncer = cubes_to_game.ChainDebouncer(1)
+        self.assertEqual(["01", "23"], debouncer.update(["01", "23"], 0))
+        # Flapping within the hold-off: nothing until it ends, and then only
+        # if the chain really changed.
+        self.assertEqual([], debouncer.update(["23"], 0.1))
+        self.assertEqual([], debouncer.update(["01", "23"], 0.2))
+        # A new chain is guessed on its own schedule.
+        self.assertEqual(["34"], debouncer.update(["012", "34"], 0.3))
+        self.assertEqual(1, debouncer.next_flush_s())
+        self.assertEqual([], debouncer.flush(0.9))
+        self.assertEqual(["012"], debouncer.flush(1))
+        self.assertIsNone(debouncer.next_flush_s())
+        self.assertEqual([], debouncer.update(["012", "34"], 5))
+
+    def test_debouncer_flap_settles_unchanged(self) -> None:
+        debouncer = cubes_to_game.ChainDebouncer(1)
+        debouncer.update(["01"], 0)
+        debouncer.update([], 0.1)
+        debouncer.update(["01"], 0.2)
+        self.assertEqual([], debouncer.flush(1))
+        self.assertEqual([], debouncer.update(["01"], 2))
+
+    async def test_debounced_guess_flushed(self) -> None:
+        guesses = []
+        async def guess_tiles_callback(guess, move_tiles):
+            guesses.append(guess)
+        self.session.set_guess_tiles_callback(guess_tiles_callback)
+        self.session.debouncer.hold_off_s = 0.01
+        await self.session.guess_word_based_on_cubes("BLOCK_0", "TAG_1", self.publish_queue)
+        await self.session.guess_word_based_on_cubes("BLOCK_1", "TAG_2", self.publish_queue)
+        self.assertEqual(["01"], guesses)
+        await asyncio.sleep(0.02)
+        self.assertEqual(["01", "012"], guesses)
+
+    async def guess_tiles_callback(self, guess, move_tiles):
+        pass
+
+class NfcMessage:
+    def __init__(self, topic, payload):
+        self.topic = aiomqtt.Topic(topic)
+        self.payload = payload
+
 class Message:
     def __init__(self, topic):
         self.topic = topic
@@ -1,28 +1,107 @@
+import bisect
+from collections import defaultdict
+import csv
+from enum import Enum
+from itertools import combinations
 import logging
+import os
 import random
-from typing import Callable
+from typing import Callable, Iterable, Iterator, Optional, Union
 
+import compiled_words
+from compiled_words import CompiledWords
+from word_frequencies import WordFrequencies
 import tiles
 from tiles import Rack
+from word_graph import WordGraph
 
 def _sort_word(word):
     return "".join(sorted(word))
 
+def _filter_words(lines: Iterable[str], min_letters: int, max_letters: int) -> Iterator[str]:
+    for line in lines:
+        word = line.strip().upper()
+        if len(word) < min_letters or len(word) > max_letters:
+            continue
+        yield word
+
+class WordSet:
+    def __init__(self, words: Iterable[str]) -> None:
+        self._all_words: set[str] = set()
+        # Anagram index: sorted letters -> every word spelled with exactly those letters.
+        self._words_by_signature: dict[str, list[str]] = defaultdict(list)
+        for word in words:
+            if word not in self._all_words:
+                self._all_words.add(word)
+                self._words_by_signature[_sort_word(word)].append(word)
+        self._sorted_words: Optional[list[str]] = None
+
+    def __len__(self) -> int:
+        return len(self._all_words)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._all_words)
+
+    def __contains__(self, word: object) -> bool:
+        return word in self._all_words
+
+    def _sorted(self) -> list[str]:
+        if self._sorted_words is None:
+            self._sorted_words = sorted(self._all_words)
+        return self._sorted_words
+
+    def has_prefix(self, prefix: str) -> bool:
+        sorted_words = self._sorted()
+        ix = bisect.bisect_left(sorted_words, prefix)
+        return ix < len(sorted_words) and sorted_words[ix].startswith(prefix)
+
+    def word_id(self, word: str) -> int:
+        # Position in alphabetical order, or -1 if word isn't in the set.
+        sorted_words = self._sorted()
+        ix = bisect.bisect_left(sorted_words, word)
+        return ix if ix < len(sorted_words) and sorted_words[ix] == word else -1
+
+    def words_for_signature(self, signature: str) -> list[str]:
+        return self._words_by_signature.get(signature, [])
+
+WORD_STORES = ("set", "compiled", "dawg")
+
+# Bingos split into equal thirds by how many words their rack can make; an
+# EASY rack has the most.
+Difficulty = Enum("Difficulty", ["EASY", "MEDIUM", "HARD"])
+
 class Dictionary:
-    def __init__(self, min_letters: int, max_letters: int, open: Callable=open) -> None:
+    def __init__(self, min_letters: int, max_letters: int, open: Callable=open,
+        word_store: str = "set") -> None:
+        if word_store not in WORD_STORES:
+            raise ValueError(f"unknown word_store {word_store}, expected one of {WORD_STORES}")
         self._open = open
+        self._word_store = word_store
         self._bingos: list[str] = []
-        self._all_words: set[str] = set()
+        self._bingos_by_difficulty: dict[Difficulty, list[str]] = {}
+        self._frequencies = WordFrequencies([], [], 0)
+        self._words: Union[WordSet, CompiledWords, WordGraph] = WordSet([])
         self._min_letters = min_letters
         self._max_letters = max_letters
 
     def read(self, dictionary_file: str, bingos_file: str) -> None:
         with self._open(dictionary_file, "r") as f:
-            for line in f:
-                word = line.strip().upper()
-                if len(word) < self._min_letters or len(word) > self._max_letters:
-                    continue
-                self._all_words.add(word)
+            if self._word_store == "compiled":
+                # Only the raw text is read here; it is split into words just when
+                # the compiled file is missing or stale.
+                text = f.read()
+                try:
+                    self._words = compiled_words.load(compiled_path(dictionary_file), text,
+                        self._min_letters, self._max_letters,
+                        lambda: _filter_words(text.splitlines(), self._min_letters, self._max_letters))
+                except OSError as e:
+                    # e.g. a read-only install: play from memory instead.
+                    logging.warning(f"can't compile {dictionary_file}, using the set store: {e}")
+                    self._words = WordSet(_filter_words(text.splitlines(), self._min_letters, self._max_letters))
+            elif self._word_store == "dawg":
+                self._words = WordGraph(_filter_words(f, self._min_letters, self._max_letters))
+            else:
+                self._words = WordSet(_filter_words(f, self._min_letters, self._max_letters))
 
         with self._open(bingos_file, "r") as f:
             for line in f:
@@ -30,10 +109,77 @@ class Dictionary:
                 if converted:
                     self._bingos.append(line.strip().upper())
 
-    def get_rack(self) -> Rack:
-        bingo = random.choice(self._bingos)
+    def read_rack_stats(self, stats_file: str) -> None:
+        # Reads the bingo,word_count,total_score rows written by rack_stats.py.
+        # Bingos missing from the stats (e.g. a stale file) are never banded.
+        bingos = set(self._bingos)
+        with self._open(stats_file, "r") as f:
+            stats = [(bingo, int(word_count)) for bingo, word_count, _ in csv.reader(f)
+                if bingo in bingos]
+        stats.sort(key=lambda row: row[1], reverse=True)
+
+        band_size = len(stats) / len(Difficulty)
+        self._bingos_by_difficulty = {difficulty: [] for difficulty in Difficulty}
+        for ix, (bingo, _) in enumerate(stats):
+            difficulty = list(Difficulty)[int(ix / band_size)]
+            self._bingos_by_difficulty[difficulty].append(bingo)
+
+    def read_frequencies(self, frequencies_file: str) -> None:
+        # Loads "count word" lines (words.txt) keyed by this dictionary's word ids.
+        # Must be called after read().
+        with self._open(frequencies_file, "r") as f:
+            self._frequencies = WordFrequencies.read(f, self._words.word_id, len(self._words))
+
+    def bingos(self) -> list[str]:
+        return list(self._bingos)
+
+    def get_rack(self, difficulty: Optional[Difficulty] = None) -> Rack:
+        bingos = self._bingos
+        if difficulty and self._bingos_by_difficulty.get(difficulty):
+            bingos = self._bingos_by_difficulty[difficulty]
+        bingo = random.choice(bingos)
         print(f"initial bingo: ---------- {bingo} --------")
         return Rack(_sort_word(bingo))
 
     def is_word(self, word: str) -> bool:
-        return word in self._all_words
+        return word in self._words
+
+    def word_id(self, word: str) -> int:
+        # Dense id in [0, number of words), -1 for non-words.
+        return self._words.word_id(word)
+
+    def word_ids(self, words: Iterable[str]) -> list[int]:
+        return [self._words.word_id(w) for w in words]
+
+    def frequencies(self, words: Iterable[str]) -> list[int]:
+        return self._frequencies.counts_for(self.word_ids(words))
+
+    def most_common(self, words: list[str]) -> list[str]:
+        # words ordered most common first, e.g. for hints.
+        counts = self.frequencies(words)
+        return [w for _, w in sorted(zip(counts, words), key=lambda cw: (-cw[0], cw[1]))]
+
+    def is_prefix(self, prefix: str) -> bool:
+        # True if some word starts with prefix, i.e. a partial cube chain can
+        # still grow into a word.
+        return self._words.has_prefix(prefix)
+
+    def words_for_rack(self, letters: str) -> list[str]:
+        if isinstance(self._words, WordGraph):
+            # One walk of the graph covers every sub-multiset at once.
+            return self._words.words_from_letters(letters, self._min_letters)
+
+        # Every sub-multiset of the rack is a candidate signature; a 6 letter
+        # rack has at most 2^6 of them, so this never touches the word list.
+        sorted_letters = _sort_word(letters)
+        signatures: set[str] = set()
+        for length in range(self._min_letters, min(self._max_letters, len(sorted_letters)) + 1):
+            signatures.update("".join(c) for c in combinations(sorted_letters, length))
+
+        words = []
+        for signature in signatures:
+            words.extend(self._words.words_for_signature(signature))
+        return sorted(words)
+
+def compiled_path(dictionary_file: str) -> str:
+    return os.path.splitext(dictionary_file)[0] + ".bin"
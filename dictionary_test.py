@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 
 from io import StringIO
+import os
 import random
+import tempfile
 import unittest
+from unittest import mock
 
 import dictionary
 
@@ -19,16 +22,162 @@ class TestDictionary(unittest.TestCase):
                 "online"
             ]))
         random.seed(1)
+        self.my_open = my_open
         self.d = dictionary.Dictionary(3, 6, open=my_open)
         self.d.read("mock_file", "bingos_file")
 
     def testGetRack(self) -> None:
         self.assertEqual("ACEHRS", self.d.get_rack().letters())
 
+    def testBingos(self) -> None:
+        self.assertEqual(["SEARCH", "ONLINE"], self.d.bingos())
+
+    def testGetRackByDifficulty(self) -> None:
+        stats = StringIO("\n".join([
+            "SEARCH,77,361",
+            "ONLINE,28,117",
+            "STALE,3,12",
+        ]))
+        self.d._open = lambda filename, mode: stats
+        self.d.read_rack_stats("bingo_stats.csv")
+        self.assertEqual("ACEHRS", self.d.get_rack(dictionary.Difficulty.EASY).letters())
+        self.assertEqual("EILNNO", self.d.get_rack(dictionary.Difficulty.MEDIUM).letters())
+        # Too few bingos to fill every band: fall back to any bingo.
+        self.assertIn(self.d.get_rack(dictionary.Difficulty.HARD).letters(), ["ACEHRS", "EILNNO"])
+
     def testIsWord(self) -> None:
         self.assertTrue(self.d.is_word("ONLINE"))
         self.assertFalse(self.d.is_word("OXLINE"))
 
+    def testWordsForRack(self) -> None:
+        self.d.read("sowpods.txt", "bingos.txt")
+        self.assertEqual(["ARCH", "SEARCH"], self.d.words_for_rack("SEARCH"))
+        self.assertEqual(["LINE", "ONLINE"], self.d.words_for_rack("NOLINE"))
+        self.assertEqual(["ARCH"], self.d.words_for_rack("HCRAZ"))
+        self.assertEqual([], self.d.words_for_rack("ZZZZZZ"))
+
+    def testWordsForRackDuplicateLetters(self) -> None:
+        self.d.read("sowpods.txt", "bingos.txt")
+        self.assertEqual([], self.d.words_for_rack("FUZ"))
+        self.assertEqual(["FUZZ"], self.d.words_for_rack("ZUFZ"))
+
+    def testIsPrefix(self) -> None:
+        self.assertTrue(self.d.is_prefix("ONL"))
+        self.assertTrue(self.d.is_prefix("SEARCH"))
+        self.assertFalse(self.d.is_prefix("SEARCHE"))
+        self.assertFalse(self.d.is_prefix("X"))
+
+    def testWordStores(self) -> None:
+        for word_store in ["set", "dawg"]:
+            d = dictionary.Dictionary(3, 6, open=self.my_open, word_store=word_store)
+            d.read("sowpods.txt", "bingos.txt")
+            self.assertTrue(d.is_word("FUZZ"))
+            self.assertFalse(d.is_word("FUZ"))
+            self.assertTrue(d.is_prefix("FUZ"))
+            self.assertEqual(["ARCH", "SEARCH"], d.words_for_rack("SEARCH"))
+
+    def testWordIds(self) -> None:
+        for word_store in ["set", "dawg"]:
+            d = dictionary.Dictionary(3, 6, open=self.my_open, word_store=word_store)
+            d.read("sowpods.txt", "bingos.txt")
+            self.assertEqual([0, 1, 2, 3, 4, -1],
+                d.word_ids(["ARCH", "FUZZ", "LINE", "ONLINE", "SEARCH", "LINES"]))
+
+    def testFrequencies(self) -> None:
+        self.d.read("sowpods.txt", "bingos.txt")
+        self.d._open = lambda filename, mode: StringIO("\n".join([
+            "47380 arch",
+            "0 fuzz",
+            "2193 search",
+            "9999 notaword",
+            "garbage",
+        ]))
+        self.d.read_frequencies("words.txt")
+        self.assertEqual(3, len(self.d._frequencies))
+        self.assertEqual([47380, 0, 0, 2193, 0], self.d.frequencies(["ARCH", "FUZZ", "LINE", "SEARCH", "NOTAWORD"]))
+        self.assertEqual([2193], self.d.frequencies(["SEARCH"]))
+        self.assertEqual(["ARCH", "SEARCH", "FUZZ", "LINE"], self.d.most_common(["LINE", "SEARCH", "FUZZ", "ARCH"]))
+
+    def testUnknownWordStore(self) -> None:
+        with self.assertRaises(ValueError):
+            dictionary.Dictionary(3, 6, word_store="btree")
+
+class TestCompiledDictionary(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.sowpods = os.path.join(self.tmp_dir.name, "sowpods.txt")
+        self.bingos = os.path.join(self.tmp_dir.name, "bingos.txt")
+        self.write(self.sowpods, ["arch", "fuzz", "line", "search", "online", "no", "toolong"])
+        self.write(self.bingos, ["search", "online"])
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def write(self, filename: str, lines: list[str]) -> None:
+        with open(filename, "w") as f:
+            f.write("\n".join(lines))
+
+    def read(self) -> dictionary.Dictionary:
+        d = dictionary.Dictionary(3, 6, word_store="compiled")
+        d.read(self.sowpods, self.bingos)
+        return d
+
+    def testIsWord(self) -> None:
+        d = self.read()
+        self.assertTrue(os.path.exists(dictionary.compiled_path(self.sowpods)))
+        self.assertTrue(d.is_word("ONLINE"))
+        self.assertTrue(d.is_word("ARCH"))
+        self.assertFalse(d.is_word("OXLINE"))
+        self.assertFalse(d.is_word("NO"))
+        self.assertFalse(d.is_word("TOOLONG"))
+        self.assertEqual(5, len(d._words))
+
+    def testWordsForRack(self) -> None:
+        d = self.read()
+        self.assertEqual(["ARCH", "SEARCH"], d.words_for_rack("SEARCH"))
+        self.assertEqual(["FUZZ"], d.words_for_rack("ZUFZ"))
+
+    def testWordIds(self) -> None:
+        d = self.read()
+        # Ordered by length, then alphabetically.
+        self.assertEqual([0, 1, 2, 3, 4, -1, -1],
+            d.word_ids(["ARCH", "FUZZ", "LINE", "ONLINE", "SEARCH", "NO", "ZZZZ"]))
+
+    def testIsPrefix(self) -> None:
+        d = self.read()
+        self.assertTrue(d.is_prefix("ONLIN"))
+        self.assertTrue(d.is_prefix("FUZZ"))
+        self.assertFalse(d.is_prefix("FUZZY"))
+        self.assertFalse(d.is_prefix("TOOL"))
+
+    def testReusesCompiledFile(self) -> None:
+        self.read()
+        mtime = os.stat(dictionary.compiled_path(self.sowpods)).st_mtime_ns
+        self.assertTrue(self.read().is_word("LINE"))
+        self.assertEqual(mtime, os.stat(dictionary.compiled_path(self.sowpods)).st_mtime_ns)
+
+    def testRebuildsWhenSourceChanges(self) -> None:
+        self.read()
+        self.write(self.sowpods, ["arch", "quiz"])
+        d = self.read()
+        self.assertTrue(d.is_word("QUIZ"))
+        self.assertFalse(d.is_word("LINE"))
+
+    def testUnwritableFallsBackToSet(self) -> None:
+        unwritable = os.path.join(self.tmp_dir.name, "missing", "sowpods.bin")
+        with mock.patch.object(dictionary, "compiled_path", lambda _: unwritable):
+            with self.assertLogs(level="WARNING"):
+                d = self.read()
+        self.assertIsInstance(d._words, dictionary.WordSet)
+        self.assertTrue(d.is_word("ONLINE"))
+        self.assertEqual(["ARCH", "SEARCH"], d.words_for_rack("SEARCH"))
+
+    def testRebuildsWhenLimitsChange(self) -> None:
+        self.read()
+        d = dictionary.Dictionary(2, 7, word_store="compiled")
+        d.read(self.sowpods, self.bingos)
+        self.assertTrue(d.is_word("NO"))
+        self.assertTrue(d.is_word("TOOLONG"))
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -86,7 +86,7 @@ async def _handle_nfc_message(topic: str, payload: bytes, client: aiomqtt.Client
     """Handle NFC tag detection messages."""
     cube_id = topic.split('/')[2]
     neighbor_tag = payload.decode()
-    results = cubes_to_game.process_tag(cube_id, neighbor_tag)
+    results = cube_session.process_tag(cube_id, neighbor_tag)
     print(f"process_tag(cube_id, neighbor_tag): {results}")
     
     # Track which indexes we've handled
@@ -188,5 +188,5 @@ def main() -> None:
         raise
 
 if __name__ == "__main__":
-    cubes_to_game.init("cube_ids.txt", "tag_ids.txt")
+    cube_session = cubes_to_game.CubeSession.from_files("cube_ids.txt", "tag_ids.txt")
     main()
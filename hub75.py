@@ -1,21 +1,40 @@
+from dataclasses import dataclass
+import logging
 import platform
+import threading
+import time
+import zlib
 
 from PIL import Image
 import pygame
 from pygame.image import tobytes
-from pygame.time import get_ticks
 
-if platform.system() != "Darwin":
-    from rgbmatrix import graphics, RGBMatrix, RGBMatrixOptions
-    import rgbmatrix
-else:
+logger = logging.getLogger(__name__)
+
+# Without the panels' library (on a Mac, or a Linux dev or CI machine) the
+# matrix is emulated as one display the size of the screen.
+emulated = platform.system() == "Darwin"
+if not emulated:
+    try:
+        from rgbmatrix import graphics, RGBMatrix, RGBMatrixOptions
+        import rgbmatrix
+    except ImportError as e:
+        # On the Pi itself a broken install would otherwise just leave the
+        # panels dark.
+        on_pi = platform.machine().startswith(("arm", "aarch64"))
+        (logger.error if on_pi else logger.warning)(f"no rgbmatrix ({e}), emulating the matrix")
+        emulated = True
+if emulated:
     from RGBMatrixEmulator import graphics, RGBMatrix, RGBMatrixOptions
     import RGBMatrixEmulator
-from typing import Union
+from typing import Any, Optional, Union
 
 matrix: RGBMatrix = None
 offscreen_canvas: Union["RGBMatrixEmulator.emulation.canvas.Canvas","RGBMatrix.Canvas"]
 
+PANEL_ROWS = 32
+PANEL_COLS = 64
+
 
 def create_rgbmatrix() -> Union["RGBMatrixEmulator.RGBMatrix", "rgbmatrix.RGBMatrix"]:
     options = RGBMatrixOptions()
@@ -33,16 +52,19 @@ def create_rgbmatrix() -> Union["RGBMatrixEmulator.RGBMatrix", "rgbmatrix.RGBMat
     options.pwm_lsb_nanoseconds = 130
     options.row_address_type = 0
 
-    if platform.system() == "Darwin":
+    if emulated:
         options.rows = 256
         options.cols = 192
         options.chain_length = 1
         options.parallel = 1
     else:
-        options.rows = 32
-        options.cols = 64
+        options.rows = PANEL_ROWS
+        options.cols = PANEL_COLS
         options.chain_length = 8
         options.parallel = 3
+        # The game draws portrait; let the library turn it to the panels'
+        # landscape layout rather than rotating every frame ourselves.
+        options.pixel_mapper_config = "U-mapper;Rotate:90"
 
     #sudo examples-api-use/demo -D0 --led-no-hardware-pulse --led-cols=64 --led-rows=32 --led-slowdown-gpio=5 --led-multiplexing=1 --led-pixel-mapper=U-mapper --led-chain 8 --led-parallel=3 
 
@@ -61,25 +83,136 @@ def init() -> None:
     my_text = "HELLO"
     graphics.DrawText(offscreen_canvas, font, pos, 10, textColor, my_text)
     offscreen_canvas = matrix.SwapOnVSync(offscreen_canvas)
+    start()
+
+@dataclass
+class MatrixStats:
+    frames: int = 0  # handed to update()
+    shown: int = 0
+    unchanged: int = 0  # same pixels as the last frame sent
+    panels_sent: int = 0  # panels covered by the part of each frame sent
+    dropped: int = 0  # replaced by a newer frame before the worker got to it
+    output_s: float = 0.0  # in SetImage and SwapOnVSync
+    latency_s: float = 0.0  # from update() until the frame is swapped in
+    start_s: float = 0.0
+
+    def fps(self) -> float:
+        elapsed_s = time.perf_counter() - self.start_s
+        return self.shown / elapsed_s if elapsed_s > 0 else 0.0
+
+    def mean_latency_ms(self) -> float:
+        return 1000 * self.latency_s / self.shown if self.shown else 0.0
+
+stats = MatrixStats()
+
+class PanelDiff:
+    # Finds the panels whose pixels changed since the last frame from a crc32
+    # of each. Turned portrait like the screen, a panel covers PANEL_ROWS
+    # columns by PANEL_COLS rows of it.
+    def __init__(self, width: int = PANEL_ROWS, height: int = PANEL_COLS) -> None:
+        self.width = width
+        self.height = height
+        self.rects: list[pygame.Rect] = []
+        self._crcs: list[int] = []
+
+    def changed(self, screen: pygame.Surface) -> set[int]:
+        columns = screen.get_width() // self.width
+        if not self.rects:
+            self.rects = [pygame.Rect(column*self.width, top, self.width, self.height)
+                for top in range(0, screen.get_height(), self.height) for column in range(columns)]
+        # Each screen row split into one cell per panel column: a panel is
+        # every columns'th cell over its rows, read without copying the screen.
+        cells = memoryview(_pixels(screen)).cast("B",
+            [screen.get_height()*columns, self.width*screen.get_bytesize()])
+        crcs = [zlib.crc32(cells[rect.top*columns + rect.left//self.width:rect.bottom*columns:columns].tobytes())
+            for rect in self.rects]
+        changed = {ix for ix, crc in enumerate(crcs) if ix >= len(self._crcs) or crc != self._crcs[ix]}
+        self._crcs = crcs
+        return changed
+
+    def bounds(self, panels: set[int]) -> pygame.Rect:
+        return pygame.Rect(self.rects[min(panels)]).unionall([self.rects[ix] for ix in panels])
+
+panels = PanelDiff()
+
+# The matrix is driven from its own thread so waiting for vsync never blocks
+# the event loop. It only ever needs the latest frame: one that arrives while
+# the previous one is still waiting replaces it.
+_frame_ready = threading.Condition()
+_next_frame: Optional[tuple[Image.Image, set[int], float]] = None
+_stopping = False
+_worker: Optional[threading.Thread] = None
+
+def start() -> None:
+    global _stopping, _worker
+    _stopping = False
+    stats.start_s = time.perf_counter()
+    _worker = threading.Thread(target=_output_frames, name="hub75", daemon=True)
+    _worker.start()
+
+def stop() -> None:
+    global _stopping
+    with _frame_ready:
+        _stopping = True
+        _frame_ready.notify()
+    if _worker:
+        _worker.join()
+
+def _raw_mode(screen: pygame.Surface) -> str:
+    # PIL raw mode naming the bytes of one 32 bit pixel in memory (little
+    # endian), e.g. "BGRX" for SDL's usual XRGB8888.
+    channels = {shift // 8: name for shift, name in zip(screen.get_shifts(), "RGB")}
+    return "".join(channels.get(byte, "X") for byte in range(4))
+
+def _pixels(screen: pygame.Surface) -> Any:
+    # The surface's own memory, not a copy of it.
+    return screen.get_view("0")
+
+def to_image(screen: pygame.Surface) -> Image.Image:
+    # One copy, straight from the surface's pixels into the image.
+    if screen.get_bitsize() != 32:
+        return Image.frombytes("RGB", screen.get_size(), tobytes(screen, "RGB"))
+    return Image.frombuffer("RGB", screen.get_size(), _pixels(screen), "raw", _raw_mode(screen), 0, 1)
 
-last_image: bytes = b''
-update_count = 0
-total_time = 1
 def update(screen: pygame.Surface) -> None:
-    global last_image, total_time,update_count
-    pixels = tobytes(screen, "RGB")
-    if pixels == last_image:
+    global _next_frame
+    submitted_s = time.perf_counter()
+    stats.frames += 1
+    changed = panels.changed(screen)
+    if not changed:
+        stats.unchanged += 1
         return
-    last_image = pixels
-    img = Image.frombytes("RGB", (screen.get_width(), screen.get_height()), pixels)
-
-    if platform.system() != "Darwin":
-# mypy: disable-error-code=attr-defined
-        img = img.rotate(270, Image.NEAREST, expand=1)
-
-    start = get_ticks()
-    offscreen_canvas.SetImage(img)
-    matrix.SwapOnVSync(offscreen_canvas)
-    total_time += get_ticks() - start
-    update_count += 1
-    # print(f"fps: {1000*update_count/total_time}")
\ No newline at end of file
+    img = to_image(screen)
+    with _frame_ready:
+        if _next_frame is not None:
+            stats.dropped += 1
+            changed |= _next_frame[1]
+        _next_frame = (img, changed, submitted_s)
+        _frame_ready.notify()
+
+def _output_frames() -> None:
+    global _next_frame, offscreen_canvas
+    last_changed: set[int] = set()
+    while True:
+        with _frame_ready:
+            while _next_frame is None and not _stopping:
+                _frame_ready.wait()
+            if _stopping or _next_frame is None:
+                return
+            img, changed, submitted_s = _next_frame
+            _next_frame = None
+        start_s = time.perf_counter()
+        # SwapOnVSync hands back the canvas shown before this one, so it is
+        # missing the last frame's changes as well as this one's.
+        area = panels.bounds(changed | last_changed)
+        last_changed = changed
+        if area.size == img.size:
+            offscreen_canvas.SetImage(img)
+        else:
+            offscreen_canvas.SetImage(img.crop((area.left, area.top, area.right, area.bottom)), area.x, area.y)
+        stats.panels_sent += sum(1 for rect in panels.rects if area.contains(rect))
+        offscreen_canvas = matrix.SwapOnVSync(offscreen_canvas)
+        shown_s = time.perf_counter()
+        stats.output_s += shown_s - start_s
+        stats.latency_s += shown_s - submitted_s
+        stats.shown += 1
\ No newline at end of file
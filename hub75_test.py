@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+import os
+import time
+import unittest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+from PIL import Image
+import pygame
+
+import hub75
+
+class Canvas:
+    def __init__(self) -> None:
+        self.image = Image.new("RGB", (192, 256))
+
+    def SetImage(self, image: Image.Image, offset_x: int = 0, offset_y: int = 0) -> None:
+        self.image.paste(image, (offset_x, offset_y))
+
+class Matrix:
+    # Double buffered like rgbmatrix: swapping returns the canvas shown before.
+    def __init__(self) -> None:
+        self.shown = Canvas()
+
+    def SwapOnVSync(self, canvas: Canvas) -> Canvas:
+        self.shown, canvas = canvas, self.shown
+        return canvas
+
+class TestPanelDiff(unittest.TestCase):
+    def setUp(self) -> None:
+        self.screen = pygame.Surface((192, 256))
+        self.diff = hub75.PanelDiff()
+
+    def test_changed(self) -> None:
+        self.assertEqual(set(range(24)), self.diff.changed(self.screen))
+        self.assertEqual(set(), self.diff.changed(self.screen))
+        self.screen.fill((255, 0, 0), (31, 64, 2, 1))
+        self.assertEqual({6, 7}, self.diff.changed(self.screen))
+        self.screen.fill((255, 0, 0), (191, 255, 1, 1))
+        self.assertEqual({23}, self.diff.changed(self.screen))
+
+    def test_bounds(self) -> None:
+        self.diff.changed(self.screen)
+        self.assertEqual(pygame.Rect(32, 0, 64, 128), self.diff.bounds({1, 8}))
+
+class TestUpdate(unittest.TestCase):
+    def setUp(self) -> None:
+        hub75.matrix = Matrix()
+        hub75.offscreen_canvas = Canvas()
+        hub75.panels = hub75.PanelDiff()
+        hub75.start()
+
+    def tearDown(self) -> None:
+        hub75.stop()
+
+    def wait_until_shown(self, shown: int, timeout_s: float = 5) -> None:
+        deadline_s = time.monotonic() + timeout_s
+        while hub75.stats.shown < shown:
+            if time.monotonic() > deadline_s:
+                self.fail(f"matrix worker showed {hub75.stats.shown} frames, expected {shown}")
+            time.sleep(0.001)
+
+    def test_partial_updates(self) -> None:
+        screen = pygame.Surface((192, 256))
+        shown = hub75.stats.shown
+        for ix, rect in enumerate([(0, 0, 192, 256), (10, 10, 5, 5), (100, 200, 5, 5), (150, 20, 1, 1)]):
+            screen.fill((ix*50, 255, 0), rect)
+            hub75.update(screen)
+            shown += 1
+            self.wait_until_shown(shown)
+            self.assertEqual(pygame.image.tobytes(screen, "RGB"), hub75.matrix.shown.image.tobytes())
+        hub75.update(screen)
+        self.assertEqual(1, hub75.stats.unchanged)
+
+if __name__ == '__main__':
+    unittest.main()
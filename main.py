@@ -4,16 +4,19 @@ import platform
 import aiomqtt
 import argparse
 import asyncio
-import datetime
+import functools
 import logging
 import os
 import pygame
 import traceback
+from typing import Optional
 
 import app
 import cubes_to_game
-from dictionary import Dictionary
-from pygameasync import events
+from dictionary import Dictionary, Difficulty
+from publisher import CoalescingPublisher
+from pygameasync import EventEngine, events
+from topic_router import TopicRouter
 import pygamegameasync
 import tiles
 import hub75
@@ -23,35 +26,32 @@ my_open = open
 
 logger = logging.getLogger(__name__)
 
-last_cube_id = None
-last_cube_time = None
-
-async def publish_tasks_in_queue(publish_client: aiomqtt.Client, queue: asyncio.Queue) -> None:
-    while True:
-        topic, message, retain = await queue.get()
+def make_publisher(publish_client: aiomqtt.Client) -> CoalescingPublisher:
+    async def publish(topic: str, message: Optional[str], retain: bool) -> None:
         await publish_client.publish(topic, message, retain=retain)
-        logger.info(f"publishing: {topic}, {message}")
-        if "cube" in str(topic):
-            cube_id = str(topic).split('/')[1]
-            if cube_id == last_cube_id:
-                # print(f"{topic}  delta: {datetime.datetime.now() - last_cube_time}")
-                pass
-
-async def trigger_events_from_mqtt(
-    subscribe_client: aiomqtt.Client, publish_queue: asyncio.Queue, block_words: pygamegameasync.BlockWordsPygame) -> None:
+    return CoalescingPublisher(publish)
 
-    global last_cube_id, last_cube_time
+async def publish_tasks_in_queue(publisher: CoalescingPublisher, queue: asyncio.Queue) -> None:
+    try:
+        await publisher.run(queue)
+    finally:
+        stats = publisher.stats
+        logger.info(f"publish stats: {stats}, saved {stats.saved()} of {stats.received} messages")
+
+def make_topic_router(publish_queue: asyncio.Queue, block_words: pygamegameasync.BlockWordsPygame,
+    sessions: cubes_to_game.SessionRouter) -> TopicRouter:
+    topics = TopicRouter()
+    async def handle_nfc(message: aiomqtt.Message, levels: list[str]) -> None:
+        await sessions.handle_nfc(publish_queue, levels[2], message)
+    topics.add("cube/nfc/+", handle_nfc)
+    block_words.add_routes(topics)
+    return topics
+
+async def trigger_events_from_mqtt(subscribe_client: aiomqtt.Client, topics: TopicRouter) -> None:
     try:
         async for message in subscribe_client.messages:
-            logger.info(f"trigger_events_from_mqtt incoming message topic: {message.topic} {message.payload!r}")
-            if message.topic.matches("cube/nfc/#"):
-                now = datetime.datetime.now()
-                cube_id = str(message.topic).split('/')[2]
-                last_cube_time = now
-                last_cube_id = cube_id
-                await cubes_to_game.handle_mqtt_message(publish_queue, message)
-            else:
-                await block_words.handle_mqtt_message(message.topic)
+            logger.info("trigger_events_from_mqtt incoming message topic: %s %r", message.topic, message.payload)
+            await topics.dispatch(message)
 
     except Exception as e:
         print(f"fatal error: {e}")
@@ -63,18 +63,41 @@ async def main(args: argparse.Namespace, dictionary: Dictionary, block_words: py
     async with aiomqtt.Client(MQTT_SERVER) as subscribe_client:
         async with aiomqtt.Client(MQTT_SERVER) as publish_client:
             publish_queue: asyncio.Queue = asyncio.Queue()
-            the_app = app.App(publish_queue, dictionary)
-            
-            cubes_to_game.init(args.cubes, args.tags)
+            publisher = make_publisher(publish_client)
+            difficulty = Difficulty[args.difficulty.upper()] if args.difficulty else None
+
+            # One session and App per table, all sharing the MQTT clients, the
+            # publish queue and the dictionary. The first table gets the display.
+            sessions = cubes_to_game.SessionRouter()
+            apps = []
+            for ix, (cubes_file, tags_file) in enumerate([(args.cubes, args.tags)] + args.table):
+                session = cubes_to_game.CubeSession.from_files(cubes_file, tags_file, args.debounce)
+                # A forced cube resync must get past the publisher's own
+                # deduplication, for this table's cubes only.
+                session.set_invalidate_callback(functools.partial(publisher.forget,
+                    [f"cube/{cube}/" for cube in session.cubes()]))
+                sessions.add(session)
+                event_engine = events if ix == 0 else EventEngine(strict=False)
+                apps.append(app.App(publish_queue, dictionary, session, difficulty, event_engine))
             await cubes_to_game.subscribe(subscribe_client)
 
             subscribe_task = asyncio.create_task(
-                trigger_events_from_mqtt(subscribe_client, publish_queue, block_words),
+                trigger_events_from_mqtt(subscribe_client, make_topic_router(publish_queue, block_words, sessions)),
                 name="mqtt subscribe handler")
-            publish_task = asyncio.create_task(publish_tasks_in_queue(publish_client, publish_queue),
+            publish_task = asyncio.create_task(publish_tasks_in_queue(publisher, publish_queue),
                 name="mqtt publish handler")
 
-            await block_words.main(the_app, subscribe_client, args.start, args)
+            # Tables without a display start with the server. They load their
+            # racks and light the borders of words spelled on their cubes, but
+            # good guesses are only scored, and letters only dropped, by the
+            # display's game loop.
+            for headless_app in apps[1:]:
+                await headless_app.start()
+            await block_words.main(apps[0], subscribe_client, args.start, args)
+            stats = block_words.frame_stats
+            logger.info(f"frame stats: {stats}, mean {stats.mean_ms():.2f}ms")
+            for headless_app in apps[1:]:
+                await headless_app.stop()
 
             subscribe_task.cancel()
             publish_queue.shutdown()
@@ -86,15 +109,26 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--tags", default="tag_ids.txt", type=str)
     parser.add_argument("--cubes", default="cube_ids.txt", type=str)
+    parser.add_argument("--table", nargs=2, action="append", default=[], metavar=("CUBES", "TAGS"),
+        help="cube and tag id files of another table to run without a display")
+    parser.add_argument("--debounce", type=float, default=cubes_to_game.DEBOUNCE_S,
+        help=f"seconds between guesses of the same chain of cubes (default: {cubes_to_game.DEBOUNCE_S})")
     parser.add_argument('--start', action=argparse.BooleanOptionalAction)
+    parser.add_argument('--dirty-rects', action=argparse.BooleanOptionalAction, default=True,
+        help="redraw only what changed each frame (default: on)")
+    parser.add_argument("--difficulty", choices=[d.name.lower() for d in Difficulty])
     args = parser.parse_args()
 
     # logger.setLevel(logging.DEBUG)
     pygame.mixer.init(frequency=48000, size=-16, channels=2)
     hub75.init()
-    dictionary = Dictionary(tiles.MIN_LETTERS, tiles.MAX_LETTERS, open=my_open)
+    dictionary = Dictionary(tiles.MIN_LETTERS, tiles.MAX_LETTERS, open=my_open, word_store="compiled")
     dictionary.read(f"{BUNDLE_TEMP_DIR}/sowpods.txt", f"{BUNDLE_TEMP_DIR}/bingos.txt")
+    if os.path.exists(f"{BUNDLE_TEMP_DIR}/bingo_stats.csv"):
+        dictionary.read_rack_stats(f"{BUNDLE_TEMP_DIR}/bingo_stats.csv")
     pygame.init()
-    block_words = pygamegameasync.BlockWordsPygame()
+    block_words = pygamegameasync.BlockWordsPygame(args.dirty_rects)
     asyncio.run(main(args, dictionary, block_words))
+    hub75.stop()
+    logger.info(f"matrix stats: {hub75.stats}, {hub75.stats.fps():.1f} fps")
     pygame.quit()
\ No newline at end of file
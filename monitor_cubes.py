@@ -66,7 +66,7 @@ class CubeMonitor:
         """Handle NFC tag detection messages."""
         cube_id = topic.split('/')[2]
         neighbor_tag = payload.decode()
-        logger.info(f"process_tag(cube_id, neighbor_tag): {cubes_to_game.process_tag(cube_id, neighbor_tag)}")
+        logger.info(f"process_tag(cube_id, neighbor_tag): {cube_session.process_tag(cube_id, neighbor_tag)}")
         if cube_id in self.cube_states:
             self.cube_states[cube_id].neighbor_tag = neighbor_tag
             self.cube_states[cube_id].neighbor_cube = self.tags_to_cubes.get(neighbor_tag, '')
@@ -125,5 +125,5 @@ def main():
         raise
 
 if __name__ == "__main__":
-    cubes_to_game.init("cube_ids.txt", "tag_ids.txt")
+    cube_session = cubes_to_game.CubeSession.from_files("cube_ids.txt", "tag_ids.txt")
     main()
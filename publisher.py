@@ -0,0 +1,89 @@
+import asyncio
+import itertools
+from dataclasses import dataclass
+import logging
+from typing import Awaitable, Callable, Hashable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# How long to keep collecting queued messages before publishing them. Rack
+# loads and guesses rewrite the same retained cube topics several times in
+# well under this.
+COALESCE_WINDOW_S = 0.005
+
+Message = tuple[str, Optional[str], bool]
+
+@dataclass
+class PublishStats:
+    received: int = 0
+    published: int = 0
+    coalesced: int = 0  # overwritten by a later message in the same batch
+    duplicates: int = 0  # same retained value as the last one published
+    batches: int = 0
+
+    def saved(self) -> int:
+        return self.coalesced + self.duplicates
+
+def _coalescable(topic: str, message: Optional[str], retain: bool) -> bool:
+    # Flashes are events, not state: every one must reach the cube.
+    return retain and message is not None and not topic.endswith("/flash")
+
+class CoalescingPublisher:
+    def __init__(self, publish: Callable[[str, Optional[str], bool], Awaitable],
+        window_s: float = COALESCE_WINDOW_S) -> None:
+        self._publish = publish
+        self._window_s = window_s
+        # Keyed by topic for retained state, by a fresh number for anything
+        # that must go out every time.
+        self._batch: dict[Hashable, Message] = {}
+        self._uncoalesced = itertools.count()
+        self._last_sent: dict[str, Optional[str]] = {}
+        self.stats = PublishStats()
+
+    def add(self, topic: str, message: Optional[str], retain: bool) -> None:
+        self.stats.received += 1
+        if not _coalescable(topic, message, retain):
+            self._batch[next(self._uncoalesced)] = (topic, message, retain)
+            return
+        if topic in self._batch:
+            # Last writer wins, at its own position in the batch so it still
+            # follows anything queued before it, e.g. a flash.
+            self.stats.coalesced += 1
+            del self._batch[topic]
+        self._batch[topic] = (topic, message, retain)
+
+    def forget(self, prefixes: Iterable[str] = ("",)) -> None:
+        # Publish the next value of the topics starting with any of prefixes
+        # (all of them by default) even if unchanged, e.g. after the broker or
+        # the cubes may have lost their state.
+        prefixes = tuple(prefixes)
+        for topic in [topic for topic in self._last_sent if topic.startswith(prefixes)]:
+            del self._last_sent[topic]
+
+    async def flush(self) -> None:
+        batch, self._batch = self._batch, {}
+        if batch:
+            self.stats.batches += 1
+        for topic, message, retain in batch.values():
+            if _coalescable(topic, message, retain) and self._last_sent.get(topic) == message:
+                self.stats.duplicates += 1
+                continue
+            await self._publish(topic, message, retain)
+            self.stats.published += 1
+            logger.info(f"publishing: {topic}, {message}")
+            if _coalescable(topic, message, retain):
+                self._last_sent[topic] = message
+
+    def _drain(self, queue: asyncio.Queue) -> None:
+        while not queue.empty():
+            self.add(*queue.get_nowait())
+
+    async def run(self, queue: asyncio.Queue) -> None:
+        while True:
+            self.add(*await queue.get())
+            self._drain(queue)
+            if self._window_s > 0:
+                await asyncio.sleep(self._window_s)
+                self._drain(queue)
+            await self.flush()
+            logger.debug(f"publish stats: {self.stats}")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+import asyncio
+from typing import Optional
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from publisher import CoalescingPublisher
+
+class TestCoalescingPublisher(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.sent: list[tuple[str, Optional[str], bool]] = []
+        async def publish(topic: str, message: Optional[str], retain: bool) -> None:
+            self.sent.append((topic, message, retain))
+        self.publisher = CoalescingPublisher(publish, window_s=0)
+
+    async def test_last_writer_wins(self) -> None:
+        self.publisher.add("cube/1/border_line", "[", True)
+        self.publisher.add("cube/2/border_line", "]", True)
+        self.publisher.add("cube/1/border_line", " ", True)
+        await self.publisher.flush()
+        self.assertEqual([("cube/2/border_line", "]", True), ("cube/1/border_line", " ", True)], self.sent)
+        self.assertEqual(1, self.publisher.stats.coalesced)
+
+    async def test_coalesced_follows_flash(self) -> None:
+        self.publisher.add("cube/1/letter", "A", True)
+        self.publisher.add("cube/1/flash", None, True)
+        self.publisher.add("cube/1/letter", "B", True)
+        await self.publisher.flush()
+        self.assertEqual([("cube/1/flash", None, True), ("cube/1/letter", "B", True)], self.sent)
+
+    async def test_drops_unchanged(self) -> None:
+        self.publisher.add("cube/1/border_color", "W", True)
+        await self.publisher.flush()
+        self.publisher.add("cube/1/border_color", "W", True)
+        await self.publisher.flush()
+        self.publisher.add("cube/1/border_color", "G", True)
+        await self.publisher.flush()
+        self.assertEqual(["W", "G"], [message for _, message, _ in self.sent])
+        self.assertEqual(1, self.publisher.stats.duplicates)
+
+    async def test_forget(self) -> None:
+        self.publisher.add("cube/1/letter", "A", True)
+        await self.publisher.flush()
+        self.publisher.forget()
+        self.publisher.add("cube/1/letter", "A", True)
+        await self.publisher.flush()
+        self.assertEqual(2, len(self.sent))
+
+    async def test_forget_prefixes(self) -> None:
+        for cube in "12":
+            self.publisher.add(f"cube/{cube}/letter", "A", True)
+        await self.publisher.flush()
+        self.publisher.forget(["cube/2/"])
+        for cube in "12":
+            self.publisher.add(f"cube/{cube}/letter", "A", True)
+        await self.publisher.flush()
+        self.assertEqual(["cube/1/letter", "cube/2/letter", "cube/2/letter"], [topic for topic, _, _ in self.sent])
+
+    async def test_flash_never_coalesced(self) -> None:
+        for _ in range(2):
+            self.publisher.add("cube/1/flash", None, True)
+            self.publisher.add("cube/1/border_color", "G", True)
+            await self.publisher.flush()
+        self.assertEqual([("cube/1/flash", None, True), ("cube/1/border_color", "G", True),
+            ("cube/1/flash", None, True)], self.sent)
+
+    async def test_run(self) -> None:
+        queue: asyncio.Queue = asyncio.Queue()
+        for line in "[-]":
+            await queue.put(("cube/1/border_line", line, True))
+        await queue.put(("cube/2/border_line", " ", True))
+        task = asyncio.create_task(self.publisher.run(queue))
+        await asyncio.sleep(0)
+        task.cancel()
+        self.assertEqual([("cube/1/border_line", "]", True), ("cube/2/border_line", " ", True)], self.sent)
+        stats = self.publisher.stats
+        self.assertEqual((4, 2, 2, 1), (stats.received, stats.published, stats.saved(), stats.batches))
+
+if __name__ == '__main__':
+    unittest.main()
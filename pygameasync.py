@@ -1,7 +1,10 @@
 import asyncio
+from dataclasses import dataclass, field
+import inspect
 import logging
 import pygame
-from typing import Callable
+import time
+from typing import Awaitable, Callable, Optional
 
 class Clock:
     def __init__(self, time_func: Callable=pygame.time.get_ticks) -> None:
@@ -23,16 +26,53 @@ class Clock:
 
         await asyncio.sleep(delay)
 
+@dataclass
+class EventStats:
+    events: int = 0
+    handler_calls: int = 0
+    total_latency_s: float = 0.0  # trigger until each handler finished
+    max_latency_s: float = 0.0
+    started_s: float = field(default_factory=time.perf_counter)
+
+    def record(self, triggered_s: float) -> None:
+        latency_s = time.perf_counter() - triggered_s
+        self.handler_calls += 1
+        self.total_latency_s += latency_s
+        self.max_latency_s = max(self.max_latency_s, latency_s)
+
+    def events_per_second(self) -> float:
+        elapsed_s = time.perf_counter() - self.started_s
+        return self.events / elapsed_s if elapsed_s else 0.0
+
+    def mean_latency_ms(self) -> float:
+        return 1000 * self.total_latency_s / self.handler_calls if self.handler_calls else 0.0
+
 class EventEngine:
-    def __init__(self) -> None:
+    def __init__(self, batched: bool = True, strict: bool = True) -> None:
+        # With batched dispatch, plain function handlers run inline in trigger()
+        # and all async handlers triggered in one tick share one task, instead
+        # of a new task (plus a gather) per event. Unless strict, events nobody
+        # listens to are dropped instead of reported.
         self.listeners: dict[str, list[Callable]] = {}
+        self._sync_listeners: dict[str, list[Callable]] = {}
+        self._async_listeners: dict[str, list[Callable]] = {}
+        self._batched = batched
+        self._strict = strict
+        self._pending: list[tuple[float, Awaitable]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self.stats = EventStats()
 
-    def on(self, event: str) -> Callable:
+    def on(self, event: str, sync: Optional[bool] = None) -> Callable:
+        # sync defaults to whether the handler is a plain function.
         if event not in self.listeners:
             self.listeners[event] = []
+            self._sync_listeners[event] = []
+            self._async_listeners[event] = []
 
         def wrapper(func, *args):
             self.listeners[event].append(func)
+            is_sync = not inspect.iscoroutinefunction(func) if sync is None else sync
+            (self._sync_listeners if is_sync else self._async_listeners)[event].append(func)
             return func
 
         return wrapper
@@ -41,19 +81,69 @@ class EventEngine:
     # code calling this will do so in a "fire-and-forget" manner, and shouldn't be
     # slowed down by needing to await a result
     def trigger(self, event, *args, **kwargs):
-        asyncio.create_task(self.async_trigger(event, *args, **kwargs), name=f"{event} handler")
+        if not self._batched:
+            asyncio.create_task(self.async_trigger(event, *args, **kwargs), name=f"{event} handler")
+            return
+
+        if event not in self.listeners:
+            if self._strict:
+                logging.error(f"trigger: no event {event} in {self.listeners}")
+            return
+        self.stats.events += 1
+        triggered_s = time.perf_counter()
+        for func in self._sync_listeners[event]:
+            try:
+                result = func(*args, **kwargs)
+            except Exception:
+                logging.exception(f"{event} handler {func}")
+                result = None
+            if inspect.isawaitable(result):
+                # e.g. a lambda wrapping a coroutine function
+                self._pending.append((triggered_s, result))
+            else:
+                self.stats.record(triggered_s)
+
+        for func in self._async_listeners[event]:
+            self._pending.append((triggered_s, func(*args, **kwargs)))
+        if self._pending and not self._flush_task:
+            self._flush_task = asyncio.create_task(self._flush(), name="event handlers")
+
+    async def _flush(self) -> None:
+        # Handlers run one after another, in trigger order. Anything triggered
+        # while they run is picked up by this same task.
+        try:
+            while self._pending:
+                pending, self._pending = self._pending, []
+                for triggered_s, handler in pending:
+                    try:
+                        await handler
+                    except Exception:
+                        logging.exception(f"event handler {handler}")
+                    self.stats.record(triggered_s)
+        finally:
+            self._flush_task = None
 
     # whatever gets triggered is just added to the current asyncio event loop,
     # which we then trust to run eventually
     async def async_trigger(self, event, *args, **kwargs):
-        logging.info(f"async_trigger: {event}")
+        logging.debug("async_trigger: %s", event)
         if event in self.listeners:
-            # print(f"in list: {event}")
-            handlers = [func(*args, **kwargs) for func in self.listeners[event]]
+            self.stats.events += 1
+            triggered_s = time.perf_counter()
+            handlers = []
+            for func in self.listeners[event]:
+                result = func(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    handlers.append(result)
+                else:
+                    self.stats.record(triggered_s)
 
             # schedule all listeners to run
-            return await asyncio.gather(*handlers)
-        else:
+            results = await asyncio.gather(*handlers)
+            for _ in handlers:
+                self.stats.record(triggered_s)
+            return results
+        elif self._strict:
             raise Exception(f"async_trigger: no event {event} in {self.listeners}")
 
 events = EventEngine()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+import asyncio
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from pygameasync import EventEngine
+import textrect
+
+class TestEventEngine(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.events = EventEngine()
+        self.calls: list[tuple] = []
+
+    async def test_sync_handler_runs_inline(self) -> None:
+        self.events.on("sync")(lambda x: self.calls.append(("sync", x)))
+        self.events.trigger("sync", 1)
+        self.assertEqual([("sync", 1)], self.calls)
+
+    async def test_async_handlers_share_one_task(self) -> None:
+        async def handler(name: str, x: int) -> None:
+            self.calls.append((name, x))
+        self.events.on("a")(lambda x: handler("a", x))
+        self.events.on("b", sync=False)(lambda x: handler("b", x))
+        tasks_before = len(asyncio.all_tasks())
+        self.events.trigger("a", 1)
+        self.events.trigger("b", 2)
+        self.events.trigger("a", 3)
+        self.assertEqual(tasks_before + 1, len(asyncio.all_tasks()))
+        self.assertEqual([], self.calls)
+
+        await asyncio.sleep(0)
+        self.assertEqual([("a", 1), ("b", 2), ("a", 3)], self.calls)
+
+    async def test_trigger_from_async_handler(self) -> None:
+        async def first() -> None:
+            self.events.trigger("second")
+        async def second() -> None:
+            self.calls.append(("second",))
+        self.events.on("first")(first)
+        self.events.on("second")(second)
+        self.events.trigger("first")
+        await asyncio.sleep(0)
+        self.assertEqual([("second",)], self.calls)
+
+    async def test_failing_handler_does_not_stop_others(self) -> None:
+        async def fail() -> None:
+            raise ValueError("fail")
+        async def succeed() -> None:
+            self.calls.append(("succeed",))
+        self.events.on("e")(fail)
+        self.events.on("e")(succeed)
+        with self.assertLogs(level="ERROR"):
+            self.events.trigger("e")
+            await asyncio.sleep(0)
+        self.assertEqual([("succeed",)], self.calls)
+
+    async def test_text_overflow_does_not_stop_others(self) -> None:
+        async def overflow() -> None:
+            raise textrect.TextRectException("too tall")
+        async def succeed() -> None:
+            self.calls.append(("succeed",))
+        self.events.on("e")(overflow)
+        self.events.on("e")(succeed)
+        with self.assertLogs(level="ERROR"):
+            self.events.trigger("e")
+            await asyncio.sleep(0)
+        self.assertEqual([("succeed",)], self.calls)
+
+    async def test_unknown_event(self) -> None:
+        with self.assertLogs(level="ERROR"):
+            self.events.trigger("nobody.listens")
+
+    async def test_unknown_event_not_strict(self) -> None:
+        with self.assertNoLogs(level="ERROR"):
+            EventEngine(strict=False).trigger("nobody.listens")
+
+    async def test_unbatched(self) -> None:
+        events = EventEngine(batched=False)
+        async def handler(x: int) -> None:
+            self.calls.append(("unbatched", x))
+        events.on("e")(handler)
+        events.trigger("e", 1)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        self.assertEqual([("unbatched", 1)], self.calls)
+
+    async def test_stats(self) -> None:
+        async def handler() -> None:
+            pass
+        self.events.on("e")(handler)
+        self.events.on("e")(lambda: None)
+        self.events.trigger("e")
+        self.events.trigger("e")
+        await asyncio.sleep(0)
+        self.assertEqual(2, self.events.stats.events)
+        self.assertEqual(4, self.events.stats.handler_calls)
+        self.assertGreater(self.events.stats.events_per_second(), 0)
+        self.assertGreaterEqual(self.events.stats.mean_latency_ms(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
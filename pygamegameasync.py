@@ -6,9 +6,11 @@ import aiofiles
 import aiomqtt
 import argparse
 import asyncio
+from dataclasses import dataclass
 from datetime import datetime
 import easing_functions
 from enum import Enum
+import itertools
 import json
 import logging
 import math
@@ -21,12 +23,13 @@ import random
 import sys
 import textrect
 import time
-from typing import cast
+from typing import Callable, Hashable
 
 import app
 from pygame.image import tobytes as image_to_string
 from pygameasync import Clock, EventEngine, events
 import tiles
+from topic_router import TopicRouter
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +39,10 @@ SCALING_FACTOR = 3
 
 TICKS_PER_SECOND = 45
 
+# Stamps each redraw of a cached surface so frames can tell it changed, even
+# across the instances that resizing creates.
+draw_versions = itertools.count()
+
 FONT = "Courier"
 ANTIALIAS = 1
 
@@ -62,6 +69,86 @@ def get_alpha(
         return int(easing(remaining_ms / duration))
     return 0
 
+class GlyphCache():
+    # Rendered letters of one font by (letter, color). Fading letters are the
+    # same glyph blitted with a surface alpha, which matches rendering them
+    # in a translucent color pixel for pixel and keeps the cache small.
+    def __init__(self, font: pygame.freetype.Font) -> None:
+        self.font = font
+        self._glyphs: dict[tuple[str, int], pygame.Surface] = {}
+
+    def get(self, letter: str, color: pygame.Color) -> pygame.Surface:
+        key = (letter, int(color))
+        glyph = self._glyphs.get(key)
+        if glyph is None:
+            glyph = self._glyphs[key] = self.font.render(letter, color)[0]
+        return glyph
+
+    def blit(self, target: pygame.Surface, letter: str, color: pygame.Color, dest, alpha: int = 255) -> None:
+        glyph = self.get(letter, color)
+        glyph.set_alpha(alpha)
+        target.blit(glyph, dest)
+        glyph.set_alpha(255)
+
+    def __len__(self) -> int:
+        return len(self._glyphs)
+
+class Frame():
+    # Display list for one frame: each blit is recorded with a key that changes
+    # whenever what it draws would, so comparing two frames finds the
+    # rectangles that changed. A key of None means "always redraw".
+    def __init__(self) -> None:
+        self.items: list[tuple[pygame.Surface, pygame.Rect, Hashable, int]] = []
+
+    def blit(self, surface: pygame.Surface, pos, key: Hashable = None, special_flags: int = 0) -> None:
+        self.items.append((surface, pygame.Rect((int(pos[0]), int(pos[1])), surface.get_size()), key, special_flags))
+
+    def _keyed(self) -> set[tuple[Hashable, tuple[int, ...]]]:
+        return {(key, tuple(rect)) for _, rect, key, _ in self.items if key is not None}
+
+    def dirty_rects(self, previous: "Frame", bounds: pygame.Rect) -> list[pygame.Rect]:
+        current, before = self._keyed(), previous._keyed()
+        rects = [rect for _, rect, key, _ in self.items
+            if key is None or (key, tuple(rect)) not in before]
+        rects += [rect for _, rect, key, _ in previous.items
+            if key is None or (key, tuple(rect)) not in current]
+
+        # Merge overlapping rectangles so no pixel is drawn twice.
+        merged: list[pygame.Rect] = []
+        for rect in rects:
+            rect = rect.clip(bounds)
+            if not rect.w or not rect.h:
+                continue
+            while (ix := rect.collidelist(merged)) >= 0:
+                rect = rect.union(merged.pop(ix))
+            merged.append(rect)
+        return merged
+
+    def draw(self, screen: pygame.Surface, rects: list[pygame.Rect]) -> None:
+        for rect in rects:
+            screen.set_clip(rect)
+            screen.fill((0, 0, 0))
+            for surface, item_rect, _, special_flags in self.items:
+                if item_rect.colliderect(rect):
+                    screen.blit(surface, item_rect, special_flags=special_flags)
+        screen.set_clip(None)
+
+@dataclass
+class FrameStats:
+    frames: int = 0
+    idle_frames: int = 0
+    total_s: float = 0.0  # game update, drawing and display, without the tick sleep
+    max_s: float = 0.0
+
+    def record(self, elapsed_s: float, idle: bool) -> None:
+        self.frames += 1
+        self.idle_frames += idle
+        self.total_s += elapsed_s
+        self.max_s = max(self.max_s, elapsed_s)
+
+    def mean_ms(self) -> float:
+        return 1000 * self.total_s / self.frames if self.frames else 0.0
+
 class GuessType(Enum):
     BAD = 0
     OLD = 1
@@ -119,6 +206,7 @@ class Letter():
         self.rack_metrics = rack_metrics
         self.new_game_y = initial_y
         self.font = font
+        self.glyphs = GlyphCache(font)
         self.letter_width, self.letter_height = rack_metrics.letter_width, rack_metrics.letter_height
         self.width = rack_metrics.letter_width
         self.height = SCREEN_HEIGHT - (rack_metrics.letter_height + initial_y)
@@ -159,7 +247,7 @@ class Letter():
         return self.new_game_y + self.pos[1] + self.letter_height
 
     def draw(self) -> None:
-        self.surface = self.font.render(self.letter, LETTER_SOURCE_COLOR)[0]
+        self.surface = self.glyphs.get(self.letter, LETTER_SOURCE_COLOR)
         remaining_ms = max(0, self.next_column_move_time_ms - pygame.time.get_ticks())
         self.fraction_complete = 1.0 - remaining_ms/self.NEXT_COLUMN_MS
         self.easing_complete = self.next_letter_easing(self.fraction_complete)
@@ -169,7 +257,7 @@ class Letter():
             self.locked_on = self.get_screen_bottom_y() + Letter.Y_INCREMENT*2 > self.height
             # print(f"{self.easing_complete} {remaining_ms} {self.fraction_complete} {self.locked_on} {self.get_screen_bottom_y() + Letter.Y_INCREMENT*2} > {self.height}")
 
-    def update(self, window: pygame.Surface, score: int) -> None:
+    def update(self, window: Frame, score: int) -> None:
         now_ms = pygame.time.get_ticks()
         fall_percent = (now_ms - self.start_fall_time_ms)/self.total_fall_time_ms
         fall_easing = self.top_bottom_easing(fall_percent)
@@ -184,7 +272,7 @@ class Letter():
 
         blit_pos = self.pos.copy()
         blit_pos[1] += self.new_game_y
-        window.blit(self.surface, blit_pos)
+        window.blit(self.surface, blit_pos, ("letter", self.letter))
         if now_ms > self.next_column_move_time_ms:
             if not self.locked_on:
                 self.letter_ix = self.letter_ix + self.column_move_direction
@@ -217,6 +305,8 @@ class Rack():
     def __init__(self, rack_metrics: RackMetrics, falling_letter: Letter) -> None:
         self.rack_metrics = rack_metrics
         self.font = rack_metrics.font
+        self.glyphs = GlyphCache(self.font)
+        self.scratch = pygame.Surface(rack_metrics.get_size())
         self.falling_letter = falling_letter
         self.tiles: list[tiles.Tile] = []
         self.running = False
@@ -235,18 +325,20 @@ class Rack():
             }
         self.game_over_surface, game_over_rect = self.font.render("GAME OVER", RACK_COLOR)
         self.game_over_pos = [SCREEN_WIDTH/2 - game_over_rect.width/2, rack_metrics.y]
+        self.version = next(draw_versions)
         events.on(f"rack.update_rack")(self.update_rack)
         events.on(f"rack.update_letter")(self.update_letter)
 
     def _render_letter(self, surface: pygame.Surface,
-        position: int, letter: str, color: pygame.Color) -> None:
-        self.font.render_to(surface,
-            self.rack_metrics.get_letter_rect(position, letter), letter, color)
+        position: int, letter: str, color: pygame.Color, alpha: int = 255) -> None:
+        self.glyphs.blit(surface, letter, color,
+            self.rack_metrics.get_letter_rect(position, letter), alpha)
 
     def letters(self) -> str:
         return ''.join([l.letter for l in self.tiles])
 
     def draw(self) -> None:
+        self.version = next(draw_versions)
         self.surface = pygame.Surface(self.rack_metrics.get_size())
         for ix, letter in enumerate(self.letters()):
             self._render_letter(self.surface, ix, letter, RACK_COLOR)
@@ -263,7 +355,7 @@ class Rack():
         self.running = False
         self.draw()
 
-    async def update_rack(self, tiles: list[tiles.Tile],
+    def update_rack(self, tiles: list[tiles.Tile],
         highlight_length: int, guess_length: int) -> None:
         self.tiles = tiles
         self.highlight_length = highlight_length
@@ -271,22 +363,20 @@ class Rack():
         self.select_count = guess_length
         self.draw()
 
-    async def update_letter(self, tile: tiles.Tile, position: int) -> None:
+    def update_letter(self, tile: tiles.Tile, position: int) -> None:
         self.tiles = self.tiles[:position] + [tile] + self.tiles[position + 1:]
         self.last_update_letter_ms = pygame.time.get_ticks()
         self.transition_tile = tile
         self.draw()
 
-    def update(self, window: pygame.Surface) -> None:
+    def update(self, window: Frame) -> None:
         if not self.running:
-            window.blit(self.game_over_surface, self.game_over_pos)
+            window.blit(self.game_over_surface, self.game_over_pos, "game over")
             return
 
-        def make_color(color: pygame.Color, alpha: int) -> pygame.Color:
-            new_color = Color(color)
-            new_color.a = alpha
-            return new_color
-        surface_with_faders = self.surface.copy()
+        surface_with_faders = self.scratch
+        surface_with_faders.blit(self.surface, (0, 0))
+        letter_index = None
         if self.falling_letter.locked_on and self.running:
             if random.randint(0, 2) == 0:
                 if self.falling_letter.letter == "!":
@@ -304,15 +394,15 @@ class Rack():
                 surface_with_faders,
                 self.tiles.index(self.transition_tile),
                 self.transition_tile.letter,
-                make_color(LETTER_SOURCE_COLOR, new_letter_alpha))
+                LETTER_SOURCE_COLOR, new_letter_alpha)
 
         good_word_alpha = get_alpha(self.easing, self.last_guess_ms, Rack.GUESS_TRANSITION_DURATION_MS)
         if good_word_alpha:
-            color = make_color(GOOD_GUESS_COLOR, good_word_alpha)
             letters = self.letters()
             for ix in range(0, self.highlight_length):
-                self._render_letter(surface_with_faders, ix, letters[ix], color)
-        window.blit(surface_with_faders, self.rack_metrics.get_rect().topleft)
+                self._render_letter(surface_with_faders, ix, letters[ix], GOOD_GUESS_COLOR, good_word_alpha)
+        window.blit(surface_with_faders, self.rack_metrics.get_rect().topleft,
+            ("rack", self.version, letter_index, new_letter_alpha, good_word_alpha))
 
 class Shield():
     ACCELERATION = 1.05
@@ -332,11 +422,11 @@ class Shield():
         self.surface = self.font.render(self.letters, SHIELD_COLOR)[0]
         self.pos[0] = int(SCREEN_WIDTH/2 - self.surface.get_width()/2)
 
-    def update(self, window: pygame.Surface) -> None:
+    def update(self, window: Frame) -> None:
         if self.active:
             self.pos[1] += self.speed
             self.speed *= 1.05
-            window.blit(self.surface, self.pos)
+            window.blit(self.surface, self.pos, ("shield", self.letters))
 
             # Get the tightest rectangle around the content for collision detection.
             self.rect = self.surface.get_bounding_rect().move(self.pos[0], self.pos[1])
@@ -367,8 +457,8 @@ class Score():
         self.score += score
         self.draw()
 
-    def update(self, window: pygame.Surface) -> None:
-        window.blit(self.surface, self.pos)
+    def update(self, window: Frame) -> None:
+        window.blit(self.surface, self.pos, ("score", self.score))
 
 class LastGuessFader():
     FADE_DURATION_MS = 2000
@@ -405,18 +495,19 @@ class LastGuessFader():
 class PreviousGuessesBase():
     FONT = "Arial"
 
-    def __init__(self, font_size, color=None, previous_guesses_instance=None) -> None:
-        self.font = pygame.freetype.SysFont(PreviousGuessesBase.FONT, font_size)
-        self.font.kerning = True
+    def __init__(self, fitter: "FontFitter", font_size: int, color=None, previous_guesses_instance=None) -> None:
+        self.font_size = font_size
+        self.font = fitter.font(font_size)
         if previous_guesses_instance:
             self.previous_guesses = previous_guesses_instance.previous_guesses
             self.color = previous_guesses_instance.color
         else:
             self.previous_guesses = []
             self.color = color
-        self.textrect = textrect.TextRectRenderer(self.font,
-                pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT),
-                self.color)
+        self.textrect = fitter.renderer(font_size, self.color)
+        self.surface = pygame.Surface((0, 0))
+        self.bounding_height = 0
+        self.version = next(draw_versions)
 
     def update_previous_guesses(self, previous_guesses: list[str]) -> None:
         self.previous_guesses = previous_guesses
@@ -424,26 +515,29 @@ class PreviousGuessesBase():
 
     def draw(self) -> None:
         self.surface = self.textrect.render(' '.join(self.previous_guesses))
+        self.bounding_height = self.surface.get_bounding_rect().height
+        self.version = next(draw_versions)
 
 class PreviousGuesses(PreviousGuessesBase):
     FONT_SIZE = 30
     POSITION_TOP = 24
     FADE_DURATION_NEW_GUESS = 2000
     FADE_DURATION_OLD_GUESS = 1000
-    def __init__(self, font_size=FONT_SIZE, previous_guesses_instance=None) -> None:
+    def __init__(self, fitter: "FontFitter", font_size=FONT_SIZE, previous_guesses_instance=None) -> None:
         if previous_guesses_instance:
             super(PreviousGuesses, self).__init__(
-                font_size,
+                fitter, font_size,
                 previous_guesses_instance=previous_guesses_instance)
             self.fader_inputs = previous_guesses_instance.fader_inputs
             self.bloop_sound = previous_guesses_instance.bloop_sound
         else:
-            super(PreviousGuesses, self).__init__(font_size, color=PREVIOUS_GUESSES_COLOR)
+            super(PreviousGuesses, self).__init__(fitter, font_size, color=PREVIOUS_GUESSES_COLOR)
             self.fader_inputs = []
             self.bloop_sound = pygame.mixer.Sound("./sounds/bloop.wav")
             self.bloop_sound.set_volume(0.2)
 
         self.faders: list[LastGuessFader] = []
+        self.scratch = pygame.Surface((0, 0), pygame.SRCALPHA)
 
     def old_guess(self, old_guess: str) -> None:
         self.fader_inputs.append(
@@ -465,40 +559,138 @@ class PreviousGuesses(PreviousGuessesBase):
                 self.faders.append(fader)
         super(PreviousGuesses, self).update_previous_guesses(previous_guesses)
 
-    def update(self, window: pygame.Surface) -> None:
-        self.draw()
-        surface_with_faders = self.surface.copy()
-        for fader in self.faders:
-            fader.blit(surface_with_faders)
-
+    def update(self, window: Frame) -> None:
+        surface_with_faders = self.surface
+        if self.faders:
+            # Composite onto a surface kept across frames instead of a fresh copy.
+            if self.scratch.get_size() != self.surface.get_size():
+                self.scratch = pygame.Surface(self.surface.get_size(), pygame.SRCALPHA)
+            self.scratch.fill((0, 0, 0, 0))
+            self.scratch.blit(self.surface, (0, 0), special_flags=pygame.BLEND_RGBA_ADD)
+            for fader in self.faders:
+                fader.blit(self.scratch)
+            surface_with_faders = self.scratch
+
+        key = ("previous guesses", self.version, tuple(f.alpha for f in self.faders))
         # remove finished faders
         self.faders[:] = [f for f in self.faders if f.alpha]
         fader_guesses = [f.last_guess for f in self.faders]
 
         # re-create fader_inputs for the faders that survived.
         self.fader_inputs = [f for f in self.fader_inputs if f[0] in fader_guesses]
-        window.blit(surface_with_faders, [0, PreviousGuesses.POSITION_TOP])
+        window.blit(surface_with_faders, [0, PreviousGuesses.POSITION_TOP], key)
 
 class RemainingPreviousGuesses(PreviousGuessesBase):
     COLOR = Color("grey")
     FONT_SIZE = 30
     TOP_GAP = 3
 
-    def __init__(self, font_size=FONT_SIZE, remaining_previous_guesses_instance=None) -> None:
+    def __init__(self, fitter: "FontFitter", font_size=FONT_SIZE, remaining_previous_guesses_instance=None) -> None:
         if remaining_previous_guesses_instance:
             super(RemainingPreviousGuesses, self).__init__(
-                font_size, previous_guesses_instance=remaining_previous_guesses_instance)
+                fitter, font_size, previous_guesses_instance=remaining_previous_guesses_instance)
         else:
-            super(RemainingPreviousGuesses, self).__init__(font_size, REMAINING_PREVIOUS_GUESSES_COLOR)
+            super(RemainingPreviousGuesses, self).__init__(fitter, font_size, REMAINING_PREVIOUS_GUESSES_COLOR)
 
-        self.surface = pygame.Surface((0, 0))
-
-    def update(self, window: pygame.Surface, height: int) -> None:
+    def update(self, window: Frame, height: int) -> None:
         top = height + PreviousGuesses.POSITION_TOP + RemainingPreviousGuesses.TOP_GAP
-        total_height = top + self.surface.get_bounding_rect().height
-        if total_height > SCREEN_HEIGHT:
-            raise textrect.TextRectException("can't update RemainingPreviousGuesses")
-        window.blit(self.surface, [0, top])
+        window.blit(self.surface, [0, top], ("remaining previous guesses", self.version))
+
+class FontFitter():
+    # Finds the largest font size at which the previous guesses and, below
+    # them, the remaining guesses fit on the screen, by binary search over
+    # sizes. Fonts and their layouts are kept per size, so measuring a list
+    # that grew by a word only lays out that word.
+    MIN_FONT_SIZE = 12
+
+    def __init__(self, max_size: int = PreviousGuesses.FONT_SIZE) -> None:
+        self.max_size = max_size
+        self._fonts: dict[int, pygame.freetype.Font] = {}
+        self._renderers: dict[tuple[int, int], textrect.TextRectRenderer] = {}
+
+    def font(self, size: int) -> pygame.freetype.Font:
+        if size not in self._fonts:
+            font = pygame.freetype.SysFont(PreviousGuessesBase.FONT, size)
+            font.kerning = True
+            self._fonts[size] = font
+        return self._fonts[size]
+
+    def renderer(self, size: int, color: pygame.Color) -> textrect.TextRectRenderer:
+        key = (size, int(color))
+        if key not in self._renderers:
+            self._renderers[key] = textrect.TextRectRenderer(self.font(size),
+                pygame.Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT), color)
+        return self._renderers[key]
+
+    def remaining_size(self, size: int) -> int:
+        # Once shrunk, the remaining guesses go a little smaller still.
+        return size if size == self.max_size else size - 2
+
+    def _height(self, size: int, color: pygame.Color, guesses: list[str]) -> int:
+        last_rect, lines, _ = self.renderer(size, color).layout(' '.join(guesses))
+        return last_rect.bottom if lines else 0
+
+    def fits(self, size: int, previous_guesses: list[str], remaining_previous_guesses: list[str]) -> bool:
+        try:
+            height = self._height(size, PREVIOUS_GUESSES_COLOR, previous_guesses)
+            remaining_height = self._height(self.remaining_size(size),
+                REMAINING_PREVIOUS_GUESSES_COLOR, remaining_previous_guesses)
+        except textrect.TextRectException:
+            return False
+        return (PreviousGuesses.POSITION_TOP + height + RemainingPreviousGuesses.TOP_GAP
+            + remaining_height <= SCREEN_HEIGHT)
+
+    def fit(self, previous_guesses: list[str], remaining_previous_guesses: list[str],
+        size: int = 0) -> tuple[int, list[str], list[str]]:
+        # Returns the font size and the guesses to show at it: all of them,
+        # unless they overflow the smallest size. Starting from the size in
+        # use, a list that changed by a word usually settles in two
+        # measurements.
+        def fits(size: int) -> bool:
+            return self.fits(size, previous_guesses, remaining_previous_guesses)
+
+        size = size or self.max_size
+        # Binary search keeping low fitting (or below the minimum) and high not.
+        if fits(size):
+            low, high = size, self.max_size + 1
+            if low < self.max_size and not fits(low + 1):
+                high = low + 1
+        else:
+            low, high = FontFitter.MIN_FONT_SIZE - 1, size
+            if high > FontFitter.MIN_FONT_SIZE and fits(high - 1):
+                low = high - 1
+        while low + 1 < high:
+            mid = (low + high) // 2
+            if fits(mid):
+                low = mid
+            else:
+                high = mid
+        if low < FontFitter.MIN_FONT_SIZE:
+            logger.warning(f"too many guesses to show: {len(previous_guesses)}, {len(remaining_previous_guesses)}")
+            return (FontFitter.MIN_FONT_SIZE,
+                *self.clip(FontFitter.MIN_FONT_SIZE, previous_guesses, remaining_previous_guesses))
+        return low, previous_guesses, remaining_previous_guesses
+
+    def clip(self, size: int, previous_guesses: list[str],
+        remaining_previous_guesses: list[str]) -> tuple[list[str], list[str]]:
+        # The most guesses that fit at size, dropping remaining guesses first
+        # and then the last previous guesses.
+        def most(count: int, fits: Callable[[int], bool]) -> int:
+            low, high = 0, count + 1
+            while low + 1 < high:
+                mid = (low + high) // 2
+                if fits(mid):
+                    low = mid
+                else:
+                    high = mid
+            return low
+
+        if self.fits(size, previous_guesses, []):
+            count = most(len(remaining_previous_guesses),
+                lambda count: self.fits(size, previous_guesses, remaining_previous_guesses[:count]))
+            return previous_guesses, remaining_previous_guesses[:count]
+        count = most(len(previous_guesses), lambda count: self.fits(size, previous_guesses[:count], []))
+        return previous_guesses[:count], []
 
 class LetterSource():
     ALPHA = 128
@@ -513,14 +705,19 @@ class LetterSource():
         self.width = width
         self.letter = letter
         self.easing = easing_functions.QuinticEaseInOut(start=1, end=LetterSource.MAX_HEIGHT, duration=1)
+        self.surfaces: dict[int, pygame.Surface] = {}
         self.draw()
 
     def draw(self) -> None:
-        self.surface = pygame.Surface([self.width, self.height], pygame.SRCALPHA)
-        self.surface.set_alpha(LetterSource.ALPHA)
-        self.surface.fill(LETTER_SOURCE_COLOR)
-
-    def update(self, window: pygame.Surface) -> None:
+        # One surface per height, made the first time the animation needs it.
+        if self.height not in self.surfaces:
+            surface = pygame.Surface([self.width, self.height], pygame.SRCALPHA)
+            surface.set_alpha(LetterSource.ALPHA)
+            surface.fill(LETTER_SOURCE_COLOR)
+            self.surfaces[self.height] = surface
+        self.surface = self.surfaces[self.height]
+
+    def update(self, window: Frame) -> None:
         if self.last_y != self.letter.start_fall_y:
             self.last_update = pygame.time.get_ticks()
             self.height = LetterSource.MAX_HEIGHT
@@ -530,7 +727,7 @@ class LetterSource():
             self.height = get_alpha(self.easing, self.last_update, LetterSource.ANIMATION_DURAION_MS)
             self.draw()
         self.pos = [self.x, self.initial_y + self.letter.start_fall_y - self.height]
-        window.blit(self.surface, self.pos)
+        window.blit(self.surface, self.pos, ("letter source", self.height))
 
 class Game:
     DELAY_BETWEEN_WORD_SOUNDS_S = 0.3
@@ -541,8 +738,11 @@ class Game:
         self.rack_metrics = RackMetrics()
         self.letter = Letter(letter_font, letter_y, self.rack_metrics)
         self.rack = Rack(self.rack_metrics, self.letter)
-        self.previous_guesses = PreviousGuesses()
-        self.remaining_previous_guesses = RemainingPreviousGuesses()
+        self.font_fitter = FontFitter()
+        self.previous_guesses = PreviousGuesses(self.font_fitter)
+        self.remaining_previous_guesses = RemainingPreviousGuesses(self.font_fitter)
+        # Every guess, including any too many to show.
+        self.guess_lists: tuple[list[str], list[str]] = ([], [])
         self.letter_source = LetterSource(
             self.letter,
             self.rack_metrics.get_rect().x, self.rack_metrics.get_rect().width,
@@ -577,15 +777,16 @@ class Game:
         self.rack.guess_type = GuessType.OLD
         self.previous_guesses.old_guess(old_guess)
 
-    async def bad_guess(self) -> None:
+    def bad_guess(self) -> None:
         self.rack.guess_type = GuessType.BAD
 
-    async def abort(self) -> None:
+    def abort(self) -> None:
         self.aborted = True
 
     async def start(self) -> None:
-        self.previous_guesses = PreviousGuesses()
-        self.remaining_previous_guesses = RemainingPreviousGuesses()
+        self.previous_guesses = PreviousGuesses(self.font_fitter)
+        self.remaining_previous_guesses = RemainingPreviousGuesses(self.font_fitter)
+        self.guess_lists = ([], [])
         self.letter.start()
         self.score.start()
         self.rack.start()
@@ -618,50 +819,46 @@ class Game:
         await self._app.stop()
         logger.info("GAME OVER OVER")
 
-    async def next_tile(self, next_letter: str) -> None:
+    def next_tile(self, next_letter: str) -> None:
         if self.letter.get_screen_bottom_y() + Letter.Y_INCREMENT*3 > self.rack_metrics.get_rect().y:
             next_letter = "!"
         self.letter.change_letter(next_letter)
 
-    def resize_previous_guesses(self) -> None:
-        font_size = (cast(float, self.previous_guesses.font.size)*4.0)/5.0
-        self.previous_guesses = PreviousGuesses(max(12, font_size), previous_guesses_instance=self.previous_guesses)
-        self.remaining_previous_guesses = RemainingPreviousGuesses(font_size-2,
-            remaining_previous_guesses_instance=self.remaining_previous_guesses)
-        self.previous_guesses.draw()
-        self.remaining_previous_guesses.draw()
-
-    def exec_with_resize(self, f):
-        retry_count = 0
-        while True:
-            try:
-                retry_count += 1
-                if retry_count > 4:
-                    raise Exception("too many TextRectException")
-                return f()
-            except textrect.TextRectException:
-                self.resize_previous_guesses()
+    def fit_previous_guesses(self, previous_guesses: list[str], remaining_previous_guesses: list[str],
+        guess: str = "") -> None:
+        # The one place the guess lists reach the display: only when one
+        # changes, never per frame, and each list is redrawn only if what it
+        # shows changed. Guesses that don't fit even the smallest font are
+        # left out.
+        self.guess_lists = (previous_guesses, remaining_previous_guesses)
+        font_size, shown_previous, shown_remaining = self.font_fitter.fit(
+            previous_guesses, remaining_previous_guesses, self.previous_guesses.font_size)
+        resized = font_size != self.previous_guesses.font_size
+        if resized:
+            self.previous_guesses = PreviousGuesses(self.font_fitter, font_size,
+                previous_guesses_instance=self.previous_guesses)
+            self.remaining_previous_guesses = RemainingPreviousGuesses(self.font_fitter,
+                self.font_fitter.remaining_size(font_size),
+                remaining_previous_guesses_instance=self.remaining_previous_guesses)
+        if guess:
+            self.previous_guesses.add_guess(shown_previous, guess)
+        elif resized or shown_previous != self.previous_guesses.previous_guesses:
+            self.previous_guesses.update_previous_guesses(shown_previous)
+        if resized or shown_remaining != self.remaining_previous_guesses.previous_guesses:
+            self.remaining_previous_guesses.update_previous_guesses(shown_remaining)
 
     async def add_guess(self, previous_guesses: list[str], guess: str) -> None:
-        self.exec_with_resize(lambda: self.previous_guesses.add_guess(previous_guesses, guess))
+        self.fit_previous_guesses(previous_guesses, self.guess_lists[1], guess)
 
     async def update_previous_guesses(self, previous_guesses: list[str]) -> None:
-        self.exec_with_resize(lambda: self.previous_guesses.update_previous_guesses(previous_guesses))
+        self.fit_previous_guesses(previous_guesses, self.guess_lists[1])
 
     async def update_remaining_previous_guesses(self, previous_guesses: list[str]) -> None:
-        self.exec_with_resize(lambda: self.remaining_previous_guesses.update_previous_guesses(previous_guesses))
-
-    def update_previous_guesses_with_resizing(self, window: pygame.Surface) -> None:
-        def update_all_previous_guesses(self, window: pygame.Surface) -> None:
-            self.previous_guesses.update(window)
-            self.remaining_previous_guesses.update(
-                window, self.previous_guesses.surface.get_bounding_rect().height)
+        self.fit_previous_guesses(self.guess_lists[0], previous_guesses)
 
-        self.exec_with_resize(lambda: update_all_previous_guesses(self, window))
-
-    async def update(self, window: pygame.Surface) -> None:
-        window.set_alpha(255)
-        self.update_previous_guesses_with_resizing(window)
+    async def update(self, window: Frame) -> None:
+        self.previous_guesses.update(window)
+        self.remaining_previous_guesses.update(window, self.previous_guesses.bounding_height)
         self.letter_source.update(window)
 
         if self.running:
@@ -717,16 +914,48 @@ class Game:
             raise e
 
 class BlockWordsPygame():
-    def __init__(self) -> None:
+    def __init__(self, dirty_rects: bool = True) -> None:
         self._window = pygame.display.set_mode(
             (SCREEN_WIDTH*SCALING_FACTOR, SCREEN_HEIGHT*SCALING_FACTOR))
         self.letter_font = pygame.freetype.SysFont(FONT, RackMetrics.LETTER_SIZE)
-
-    async def handle_mqtt_message(self, topic: aiomqtt.Topic) -> None:
-        if topic.matches("app/start"):
+        self.dirty_rects = dirty_rects
+        self.frame_stats = FrameStats()
+        self._last_frame = Frame()
+
+    async def render(self, game: Game, screen: pygame.Surface) -> bool:
+        # Returns whether anything on screen changed.
+        start = time.perf_counter()
+        frame = Frame()
+        await game.update(frame)
+        if self.dirty_rects:
+            rects = frame.dirty_rects(self._last_frame, screen.get_rect())
+        else:
+            rects = [screen.get_rect()]
+        self._last_frame = frame
+        frame.draw(screen, rects)
+        if not self.dirty_rects:
+            pygame.transform.scale(screen,
+                self._window.get_rect().size, dest_surface=self._window)
+            pygame.display.flip()
+        elif rects:
+            scaled_rects = []
+            for rect in rects:
+                scaled = pygame.Rect(rect.x*SCALING_FACTOR, rect.y*SCALING_FACTOR,
+                    rect.w*SCALING_FACTOR, rect.h*SCALING_FACTOR)
+                pygame.transform.scale(screen.subsurface(rect),
+                    scaled.size, dest_surface=self._window.subsurface(scaled))
+                scaled_rects.append(scaled)
+            pygame.display.update(scaled_rects)
+        self.frame_stats.record(time.perf_counter() - start, not rects)
+        return bool(rects)
+
+    def add_routes(self, topics: TopicRouter) -> None:
+        async def start(message: aiomqtt.Message, levels: list[str]) -> None:
             events.trigger("game.start")
-        elif topic.matches("app/abort"):
+        async def abort(message: aiomqtt.Message, levels: list[str]) -> None:
             events.trigger("game.abort")
+        topics.add("app/start", start)
+        topics.add("app/abort", abort)
 
     async def main(self, the_app: app.App, subscribe_client: aiomqtt.Client, start: bool, args: argparse.Namespace) -> None:
         screen = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
@@ -774,10 +1003,6 @@ class BlockWordsPygame():
                             game.rack.select_count = len(keyboard_guess)
                             logger.info(f"key: {str(key)} {keyboard_guess}")
 
-            screen.fill((0, 0, 0))
-            await game.update(screen)
-            hub75.update(screen)
-            pygame.transform.scale(screen,
-                self._window.get_rect().size, dest_surface=self._window)
-            pygame.display.flip()
+            if await self.render(game, screen):
+                hub75.update(screen)
             await clock.tick(TICKS_PER_SECOND)
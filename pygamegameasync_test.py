@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+
+import os
+import tracemalloc
+import unittest
+from unittest import mock
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import pygame
+
+import pygamegameasync
+from pygamegameasync import (FontFitter, Frame, Game, GlyphCache, Letter, LetterSource, PreviousGuesses,
+    PreviousGuessesBase, Rack, RackMetrics, RemainingPreviousGuesses)
+import tiles
+
+class TestRenderAllocation(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        pygame.init()
+        pygame.mixer.init()
+        if not pygamegameasync.letter_beeps:
+            for n in range(11):
+                pygamegameasync.letter_beeps.append(pygame.mixer.Sound(f"sounds/{n}.wav"))
+
+    def setUp(self) -> None:
+        self.ticks = 0
+        self.get_ticks = pygame.time.get_ticks
+        pygame.time.get_ticks = lambda: self.ticks
+
+        metrics = RackMetrics()
+        font = pygame.freetype.SysFont(pygamegameasync.FONT, RackMetrics.LETTER_SIZE)
+        self.letter = Letter(font, 30, metrics)
+        self.rack = Rack(metrics, self.letter)
+        self.letter_source = LetterSource(self.letter, 0, metrics.get_rect().width, 30)
+        self.rack.start()
+        self.rack.update_rack([tiles.Tile(l, str(ix)) for ix, l in enumerate("SEARCH")], 3, 4)
+        self.letter.change_letter("Q")
+
+    def tearDown(self) -> None:
+        pygame.time.get_ticks = self.get_ticks
+
+    def render(self, frames: int) -> Frame:
+        for _ in range(frames):
+            self.ticks += 20
+            frame = Frame()
+            self.letter.update(frame, 0)
+            self.rack.update(frame)
+            self.letter_source.update(frame)
+        return frame
+
+    def test_steady_state(self) -> None:
+        # Run through the rack's fades first so every glyph is cached.
+        self.rack.update_letter(tiles.Tile("Z", "2"), 2)
+        self.render(Rack.LETTER_TRANSITION_DURATION_MS // 20)
+        self.rack.update_letter(tiles.Tile("Y", "2"), 2)
+        self.render(1)
+        glyphs = len(self.rack.glyphs)
+
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        try:
+            first = self.render(50)
+            before = tracemalloc.get_traced_memory()[0]
+            second = self.render(100)
+            after = tracemalloc.get_traced_memory()[0]
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+
+        self.assertLess(after - before, 1024)
+        self.assertEqual([id(item[0]) for item in first.items], [id(item[0]) for item in second.items])
+        self.assertEqual(glyphs, len(self.rack.glyphs))
+
+    def test_glyph_alpha(self) -> None:
+        glyphs = GlyphCache(pygame.freetype.SysFont(pygamegameasync.FONT, 25))
+        color = pygame.Color("Green")
+        faded = pygame.Color(color)
+        faded.a = 100
+        expected = pygame.Surface((40, 40))
+        glyphs.font.render_to(expected, (5, 5), "W", faded)
+        surface = pygame.Surface((40, 40))
+        glyphs.blit(surface, "W", color, (5, 5), 100)
+        self.assertEqual(pygame.image.tobytes(expected, "RGB"), pygame.image.tobytes(surface, "RGB"))
+        self.assertEqual(255, glyphs.get("W", color).get_alpha())
+
+class TestFontFitter(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        pygame.init()
+        pygame.mixer.init()
+
+    def setUp(self) -> None:
+        with open("sowpods.txt") as f:
+            self.words = [w.strip().upper() for w in f if len(w.strip()) == 5][:400]
+
+    def test_fit(self) -> None:
+        fitter = FontFitter()
+        words = self.words
+        self.assertEqual((fitter.max_size, words[:3], []), fitter.fit(words[:3], []))
+        sizes = []
+        for count in range(5, len(words), 5):
+            previous, remaining = words[:count], words[count:count+10]
+            size, shown_previous, shown_remaining = fitter.fit(previous, remaining)
+            if (shown_previous, shown_remaining) != (previous, remaining):
+                break
+            self.assertTrue(fitter.fits(size, previous, remaining))
+            if size < fitter.max_size:
+                self.assertFalse(fitter.fits(size + 1, previous, remaining))
+            sizes.append(size)
+        self.assertEqual(sorted(sizes, reverse=True), sizes)
+        self.assertEqual(FontFitter.MIN_FONT_SIZE, sizes[-1])
+        self.assertIs(fitter.font(20), fitter.font(20))
+
+    def test_too_many(self) -> None:
+        fitter = FontFitter()
+        size, previous, remaining = fitter.fit(self.words[:300], self.words[300:])
+        self.assertEqual(FontFitter.MIN_FONT_SIZE, size)
+        self.assertEqual(self.words[:len(previous)], previous)
+        self.assertEqual([], remaining)
+        self.assertTrue(fitter.fits(size, previous, []))
+        self.assertFalse(fitter.fits(size, self.words[:len(previous) + 1], []))
+
+        # Whatever is shown draws, faders included, without overflowing.
+        guesses = PreviousGuesses(fitter, size)
+        guesses.add_guess(previous, previous[-1])
+        RemainingPreviousGuesses(fitter, fitter.remaining_size(size)).update_previous_guesses(remaining)
+
+    def test_too_many_remaining(self) -> None:
+        fitter = FontFitter()
+        size, previous, remaining = fitter.fit(self.words[:20], self.words[20:])
+        self.assertEqual((FontFitter.MIN_FONT_SIZE, self.words[:20]), (size, previous))
+        self.assertEqual(self.words[20:20 + len(remaining)], remaining)
+        self.assertTrue(fitter.fits(size, previous, remaining))
+        self.assertFalse(fitter.fits(size, previous, self.words[20:21 + len(remaining)]))
+
+class TestGameGuessLists(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        pygame.init()
+        pygame.mixer.init()
+        with open("sowpods.txt") as f:
+            self.words = [w.strip().upper() for w in f if len(w.strip()) == 5][:400]
+        with mock.patch.object(pygamegameasync, "events"), mock.patch("builtins.open", mock.mock_open()):
+            self.game = Game(mock.Mock(), FontFitter().font(40))
+
+    async def asyncTearDown(self) -> None:
+        self.game.sound_queue_task.cancel()
+
+    async def test_clipped_list_recovers(self) -> None:
+        game = self.game
+        remaining = self.words[20:95]
+        await game.update_previous_guesses(self.words[:20])
+        await game.update_remaining_previous_guesses(remaining)
+        self.assertNotEqual(remaining, game.remaining_previous_guesses.previous_guesses)
+
+        # Fewer previous guesses leave room for all the remaining ones.
+        await game.update_previous_guesses(self.words[:10])
+        self.assertEqual(remaining, game.remaining_previous_guesses.previous_guesses)
+
+    async def test_add_guess_draws_once(self) -> None:
+        game = self.game
+        await game.update_previous_guesses(self.words[:3])
+        with mock.patch.object(PreviousGuessesBase, "draw", autospec=True) as draw:
+            await game.add_guess(self.words[:4], self.words[3])
+        self.assertEqual([mock.call(game.previous_guesses)], draw.call_args_list)
+        self.assertEqual(self.words[3], game.previous_guesses.fader_inputs[-1][0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+#! /usr/bin/env python
+
+# Offline precomputation of how many words (and points) each bingo's rack can
+# make, so Dictionary.get_rack can pick a rack by difficulty without running
+# the enumeration at game start. Rerun whenever sowpods.txt or bingos.txt change:
+#   python rack_stats.py
+
+import argparse
+import csv
+from typing import TextIO
+
+from dictionary import Dictionary
+from scorecard import calculate_score
+import tiles
+
+def rack_stats(dictionary: Dictionary, bingos: list[str]) -> list[tuple[str, int, int]]:
+    stats = []
+    for bingo in bingos:
+        words = dictionary.words_for_rack(bingo)
+        stats.append((bingo, len(words), sum(calculate_score(w) for w in words)))
+    return stats
+
+def write_rack_stats(f: TextIO, stats: list[tuple[str, int, int]]) -> None:
+    csv.writer(f, lineterminator="\n").writerows(stats)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Precompute word counts and scores for every bingo rack")
+    parser.add_argument("--sowpods", default="sowpods.txt")
+    parser.add_argument("--bingos", default="bingos.txt")
+    parser.add_argument("--output", default="bingo_stats.csv")
+    args = parser.parse_args()
+
+    dictionary = Dictionary(tiles.MIN_LETTERS, tiles.MAX_LETTERS)
+    dictionary.read(args.sowpods, args.bingos)
+    with open(args.output, "w") as f:
+        write_rack_stats(f, rack_stats(dictionary, dictionary.bingos()))
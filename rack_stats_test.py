@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+
+from io import StringIO
+import unittest
+from unittest import mock
+
+from dictionary import Dictionary
+import rack_stats
+import tiles
+
+class TestRackStats(unittest.TestCase):
+    @mock.patch.object(tiles, "MAX_LETTERS", 6)
+    def test_rack_stats(self) -> None:
+        my_open = lambda filename, mode: StringIO("\n".join([
+            "arch",
+            "ache",
+            "search",
+            "online"
+        ])) if filename == "sowpods.txt" else StringIO("\n".join([
+            "search",
+            "online"
+        ]))
+        dictionary = Dictionary(3, 6, open=my_open)
+        dictionary.read("sowpods.txt", "bingos.txt")
+        stats = rack_stats.rack_stats(dictionary, ["SEARCH", "ONLINE"])
+        self.assertEqual([("SEARCH", 3, 4 + 4 + 16), ("ONLINE", 1, 16)], stats)
+
+        f = StringIO()
+        rack_stats.write_rack_stats(f, stats)
+        self.assertEqual("SEARCH,3,24\nONLINE,1,16\n", f.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,4 @@
 #!/bin/bash
 export PYTHONPATH=../easing-functions
-python -X dev -X tracemalloc=5 -m unittest app_test.py cubes_to_game_test.py dictionary_test.py scorecard_test.py tiles_test.py
+python -X dev -X tracemalloc=5 -m unittest app_test.py cubes_to_game_test.py dictionary_test.py hub75_test.py pygameasync_test.py pygamegameasync_test.py publisher_test.py rack_stats_test.py scorecard_test.py tiles_test.py topic_router_test.py word_graph_test.py
 mypy *.py
@@ -1,7 +1,9 @@
+from collections import defaultdict
 from enum import Enum
 import logging
 import os
 from pathlib import Path
+from typing import Optional
 
 import dictionary
 import tiles
@@ -13,6 +15,9 @@ SCRABBLE_LETTER_SCORES = {
 
 Play = Enum("Play", ["GOOD", "MISSING_LETTERS", "DUPE_WORD", "BAD_WORD"])
 
+def calculate_score(word: str) -> int:
+    return len(word) + (10 if len(word) == tiles.MAX_LETTERS else 0)
+
 class ScoreCard:
     def __init__(self, player_rack:tiles.Rack, dictionary: dictionary.Dictionary) -> None:
         self.previous_guesses: set[str] = set()
@@ -21,9 +26,11 @@ class ScoreCard:
         self.remaining_previous_guesses: set[str] = set() # After possible have been removed
         self.player_rack = player_rack
         self.dictionary = dictionary
+        self._guess_counts: dict[str, int] = {} # tiles.letter_counts() of each previous guess
+        self._guesses_by_letter: dict[str, set[str]] = defaultdict(set)
 
     def calculate_score(self, word: str) -> int:
-        return len(word) + (10 if len(word) == tiles.MAX_LETTERS else 0)
+        return calculate_score(word)
 
     def is_old_guess(self, guess: str) -> bool:
         return guess in self.staged_guesses
@@ -45,10 +52,40 @@ class ScoreCard:
         self.player_rack.guess(guess)
         self.previous_guesses.add(guess)
         self.possible_guessed_words.add(guess)
+        self._guess_counts[guess] = tiles.letter_counts(guess)
+        for letter in guess:
+            self._guesses_by_letter[letter].add(guess)
+
+    def _counts(self, guess: str) -> int:
+        if guess not in self._guess_counts:
+            self._guess_counts[guess] = tiles.letter_counts(guess)
+        return self._guess_counts[guess]
+
+    def update_previous_guesses(self, old_letter: Optional[str] = None,
+        new_letter: Optional[str] = None) -> tuple[set[str], set[str]]:
+        # Returns (newly possible, newly impossible) guesses. When the rack
+        # changed by one letter, only guesses spelled with old_letter or
+        # new_letter can change; otherwise every guess is rechecked.
+        rack_counts = self.player_rack.counts()
+        if old_letter is None or new_letter is None:
+            self._guesses_by_letter.clear()
+            for word in self.previous_guesses:
+                for letter in word:
+                    self._guesses_by_letter[letter].add(word)
+            candidates = self.previous_guesses
+        else:
+            candidates = self._guesses_by_letter.get(old_letter, set()) | self._guesses_by_letter.get(new_letter, set())
 
-    def update_previous_guesses(self) -> None:
-        self.possible_guessed_words = set([word for word in self.previous_guesses if not self.player_rack.missing_letters(word)])
+        now_possible = set([word for word in candidates
+            if not tiles.missing_counts(self._counts(word), rack_counts)])
+        newly_possible = now_possible - self.possible_guessed_words
+        newly_impossible = (candidates - now_possible) & self.possible_guessed_words
+        if candidates is self.previous_guesses:
+            self.possible_guessed_words = now_possible
+        else:
+            self.possible_guessed_words = (self.possible_guessed_words - newly_impossible) | newly_possible
         self.remaining_previous_guesses = self.previous_guesses - self.possible_guessed_words
+        return newly_possible, newly_impossible
 
     def get_previous_guesses(self) -> list[str]:
         return sorted(list(self.possible_guessed_words))
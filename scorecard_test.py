@@ -43,6 +43,29 @@ class TestScoreCard(unittest.TestCase):
         self.score_card.update_previous_guesses()
         self.assertEqual(set(["CAT"]), self.score_card.possible_guessed_words)
 
+    def test_update_previous_guesses_incremental(self):
+        self.score_card.player_rack = tiles.Rack("CATDOGS")
+        for guess in ["CAT", "DOG", "GOD", "SAT", "TAG"]:
+            self.score_card.add_guess(guess)
+
+        self.score_card.player_rack.replace_letter("X", 4) # O -> X
+        self.assertEqual((set(), set(["DOG", "GOD"])),
+            self.score_card.update_previous_guesses("O", "X"))
+        self.assertEqual(set(["CAT", "SAT", "TAG"]), self.score_card.possible_guessed_words)
+        self.assertEqual(set(["DOG", "GOD"]), self.score_card.remaining_previous_guesses)
+
+        self.score_card.player_rack.replace_letter("O", 0) # C -> O
+        self.assertEqual((set(["DOG", "GOD"]), set(["CAT"])),
+            self.score_card.update_previous_guesses("C", "O"))
+        self.assertEqual(set(["DOG", "GOD", "SAT", "TAG"]), self.score_card.possible_guessed_words)
+        self.assertEqual(set(["CAT"]), self.score_card.remaining_previous_guesses)
+
+        self.score_card.player_rack.replace_letter("Z", 6) # S -> Z
+        self.score_card.update_previous_guesses("S", "Z")
+        incremental = set(self.score_card.possible_guessed_words)
+        self.score_card.update_previous_guesses()
+        self.assertEqual(incremental, self.score_card.possible_guessed_words)
+
     def test_get_previous_guesses(self):
         self.score_card.possible_guessed_words = set(["CAT", "DOG"])
         self.assertEqual(["CAT", "DOG"],
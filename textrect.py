@@ -1,10 +1,11 @@
 #! /usr/bin/env python
 
-import functools
+from collections import OrderedDict
 import pygame
+import pygame.freetype
 # https://www.pygame.org/pcr/text_rect/index.php
 
-class TextRectException(BaseException):
+class TextRectException(Exception):
     def __init__(self, message: str) -> None:
         self.message = message
 
@@ -12,32 +13,110 @@ class TextRectException(BaseException):
         return self.message
 
 class FontRectGetter():
+    # Every string measured in one font, kept for good: words and the lines
+    # built from them repeat for the whole game.
     def __init__(self, font: pygame.freetype.Font) -> None:
         self._font = font
+        self._rects: dict[str, pygame.Rect] = {}
+
+    def get_rect(self, text: str) -> pygame.Rect:
+        rect = self._rects.get(text)
+        if rect is None:
+            rect = self._rects[text] = self._font.get_rect(text)
+        return rect
+
+class WordWrap():
+    # Greedy word wrap of one line of text, remembered word by word, so words
+    # that start the same as last time are not laid out again.
+    def __init__(self, rg: FontRectGetter, width: int) -> None:
+        self._rg = rg
+        self._width = width
+        self._words: list[str] = []
+        self._lines: list[str] = []
+        # After each word: how many lines were finished, and the line so far.
+        self._ends: list[tuple[int, str]] = []
+
+    def wrap(self, words: list[str]) -> list[str]:
+        common = 0
+        for cached, word in zip(self._words, words):
+            if cached != word:
+                break
+            common += 1
+        if common < min(len(self._words), len(words)):
+            del self._words[common:]
+            del self._ends[common:]
+            del self._lines[self._ends[-1][0] if self._ends else 0:]
+
+        line = self._ends[-1][1] if self._ends else ""
+        for word in words[len(self._words):]:
+            if self._rg.get_rect(word).width >= self._width:
+                raise TextRectException("The word " + word + " is too long to fit in the rect passed.")
+            test_line = line + word + " "
+            # Build the line while the words fit.
+            if self._rg.get_rect(test_line).width < self._width:
+                line = test_line
+            else:
+                self._lines.append(line[:-1])
+                line = word + " "
+            self._words.append(word)
+            self._ends.append((len(self._lines), line))
+
+        finished, line = self._ends[len(words) - 1] if words else (0, "")
+        return self._lines[:finished] + [line[:-1]]
+
+class LineCache():
+    # Rendered lines, least recently used first, bounded by their total pixel
+    # bytes: a few long lines cost as much to keep as many short ones.
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._surfaces: OrderedDict[tuple, pygame.Surface] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._surfaces)
+
+    def get(self, font: pygame.freetype.Font, line: str, color: pygame.Color) -> pygame.Surface:
+        key = (line, font.name, font.size, int(color))
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            return surface
+        surface = self._surfaces[key] = font.render(line, color)[0]
+        self.bytes += surface.get_pitch() * surface.get_height()
+        while self.bytes > self.max_bytes and len(self._surfaces) > 1:
+            _, evicted = self._surfaces.popitem(last=False)
+            self.bytes -= evicted.get_pitch() * evicted.get_height()
+        return surface
 
-    @functools.lru_cache(maxsize=64)
-    def get_rect(self, text: str):
-        return self._font.get_rect(text)
+line_cache = LineCache(4 << 20)
 
 class Blitter():
+    # Composites lines into one surface that is reused from render to render,
+    # so the surface returned is only good until the next blit. Lines that
+    # haven't moved since the last blit are left in place.
     def __init__(self, font: pygame.freetype.Font, color: pygame.Color, rect: pygame.Rect) -> None:
         self._font = font
         self._color = color
         self._rect = rect
-
-    def _render_blit(self, surface: pygame.Surface, line: str, height: int) -> pygame.Surface:
-        surface.blit(self._font.render(line, self._color)[0], (0, height))
-        return surface
-
-    @functools.lru_cache(maxsize=64)
-    def blit(self, lines: tuple[str], heights: tuple[int]) -> pygame.Surface:
-        if len(lines) == 0:
-            return pygame.Surface(self._rect.size, pygame.SRCALPHA)
-        if len(lines) == 1:
-            return self._render_blit(self.blit((), ()).copy(), lines[0], heights[0])
-
-        previous_lines_surface = self.blit(tuple(lines[:-1]), tuple(heights[:-1])).copy()
-        return self._render_blit(previous_lines_surface, lines[-1], heights[-1])
+        self._target = pygame.Surface(rect.size, pygame.SRCALPHA)
+        self._lines: tuple[str, ...] = ()
+        self._heights: tuple[int, ...] = ()
+
+    def blit(self, lines: tuple[str, ...], heights: tuple[int, ...]) -> pygame.Surface:
+        kept = 0
+        for old, new in zip(zip(self._lines, self._heights), zip(lines, heights)):
+            if old != new:
+                break
+            kept += 1
+        if kept < len(self._lines):
+            # Lines never overlap, so clearing from the first changed one down
+            # leaves the kept lines untouched.
+            top = self._heights[kept]
+            self._target.fill((0, 0, 0, 0), (0, top, self._rect.width, self._rect.height - top))
+        for line, height in zip(lines[kept:], heights[kept:]):
+            self._target.blit(line_cache.get(self._font, line, self._color), (0, height))
+        self._lines, self._heights = lines, heights
+        return self._target
 
 class TextRectRenderer():
     def __init__(self, font: pygame.freetype.Font, rect: pygame.Rect, color: pygame.Color) -> None:
@@ -46,79 +125,53 @@ class TextRectRenderer():
         self._color = color
         self._font_rect_getter = FontRectGetter(font)
         self._blitter = Blitter(font, color, rect)
+        self._wraps: list[WordWrap] = []  # one per line of the text
 
     def render(self, string: str) -> pygame.Surface:
-        return render_textrect(string, self._blitter, self._font, self._rect, self._color, self._font_rect_getter)
+        _, lines, heights = self.layout(string)
+        return self._blitter.blit(lines, heights)
 
     def get_last_rect(self, string: str) -> pygame.Rect:
-        return get_last_textrect(string, self._blitter, self._font,
-            self._rect, self._color, self._font_rect_getter)
-
-def prerender_textrect(string: str, blitter: Blitter, font: pygame.freetype.Font, rect: pygame.Rect,
-    text_color: pygame.Color, rg: FontRectGetter, 
-    rect_only=False) -> tuple[pygame.Rect, tuple[str, ...], tuple[int, ...]]:
-    final_lines = []
-    last_rect = pygame.Rect()
-    requested_lines = string.splitlines()
-
-    for requested_line in requested_lines:
-        if rg.get_rect(requested_line).width > rect.width:
-            words = requested_line.split(' ')
-
-            # if any of our words are too long to fit, return.
-            for word in words:
-                last_rect = rg.get_rect(word)
-                if last_rect.width >= rect.width:
-                    raise TextRectException("The word " + word + " is too long to fit in the rect passed.")
-
-            # Start a new line
-            accumulated_line = ""
-            for word in words:
-                test_line = accumulated_line + word + " "
-
-                # Build the line while the words fit.
-                if rg.get_rect(test_line).width < rect.width:
-                    accumulated_line = test_line
-                else:
-                    final_lines.append(accumulated_line[:-1])
-                    last_rect = rg.get_rect(accumulated_line[:-1])
-                    accumulated_line = word + " "
-            final_lines.append(accumulated_line[:-1])
-            last_rect = rg.get_rect(accumulated_line[:-1])
-        else:
-            final_lines.append(requested_line)
-            last_rect = rg.get_rect(requested_line)
-
-
-    accumulated_height = 0
-    accumulated_lines = []
-    heights = []
-    for line in final_lines:
-        accumulated_lines.append(line)
-        heights.append(accumulated_height)
-        line_rect = rg.get_rect(line)
-        if accumulated_height + line_rect.height >= rect.height:
-            raise TextRectException("Once word-wrapped, the text string was too tall to fit in the rect.")
-        last_rect.y = accumulated_height
-        accumulated_height += line_rect.height + int(line_rect.height/3)
-
-    last_rect.x = 0
-    return last_rect, tuple(accumulated_lines), tuple(heights)
-
-def render_textrect(string: str, blitter: Blitter, font: pygame.freetype.Font, rect: pygame.Rect,
-    text_color: pygame.Color, rg: FontRectGetter, rect_only=False) -> pygame.Surface:
-
-    _, accumulated_lines, heights = prerender_textrect(string, blitter, font, rect, text_color, rg)
-    return blitter.blit(accumulated_lines, heights)
-
-def get_last_textrect(string: str, blitter: Blitter, font: pygame.freetype.Font, rect: pygame.Rect,
-    text_color: pygame.Color, rg: FontRectGetter, rect_only=False) -> pygame.Rect:
-    return prerender_textrect(string, blitter, font, rect, text_color, rg)[0]
+        return self.layout(string)[0]
+
+    def layout(self, string: str) -> tuple[pygame.Rect, tuple[str, ...], tuple[int, ...]]:
+        rg = self._font_rect_getter
+        final_lines: list[str] = []
+        for ix, requested_line in enumerate(string.splitlines()):
+            if rg.get_rect(requested_line).width > self._rect.width:
+                while len(self._wraps) <= ix:
+                    self._wraps.append(WordWrap(rg, self._rect.width))
+                final_lines += self._wraps[ix].wrap(requested_line.split(' '))
+            else:
+                final_lines.append(requested_line)
+
+        accumulated_height = 0
+        heights = []
+        for line in final_lines:
+            heights.append(accumulated_height)
+            line_rect = rg.get_rect(line)
+            if accumulated_height + line_rect.height >= self._rect.height:
+                raise TextRectException("Once word-wrapped, the text string was too tall to fit in the rect.")
+            accumulated_height += line_rect.height + int(line_rect.height/3)
+
+        last_rect = pygame.Rect(rg.get_rect(final_lines[-1])) if final_lines else pygame.Rect()
+        last_rect.topleft = (0, heights[-1] if heights else 0)
+        return last_rect, tuple(final_lines), tuple(heights)
 
 def textrect_loop(trr, my_string):
     for i in range(1000):
         trr.render(my_string)
 
+def textrect_guesses_loop(font, rect, color, guesses):
+    # Games of a guess list growing a word at a time, as PreviousGuesses
+    # renders it, looking up where the newest guess ended up for its fader.
+    for game in range(50):
+        trr = TextRectRenderer(font, rect, color)
+        for i in range(1, len(guesses) + 1):
+            string = ' '.join(guesses[:i])
+            trr.render(string)
+            trr.get_last_rect(string)
+
 if __name__ == '__main__':
     import cProfile
     import pygame
@@ -138,6 +191,8 @@ if __name__ == '__main__':
     my_rect = pygame.Rect((40, 40, 300, 400))
     trr = TextRectRenderer(my_font, my_rect, pygame.Color(216, 216, 216))
     cProfile.run('textrect_loop(trr, my_string)')
+    guesses = my_string.split()[:40]
+    cProfile.run('textrect_guesses_loop(my_font, my_rect, pygame.Color(216, 216, 216), guesses)')
     rendered_text = trr.render(my_string)
 
     display.blit(rendered_text, my_rect.topleft)
@@ -1,8 +1,10 @@
-from collections import Counter
+import bisect
+from collections import Counter, defaultdict
 from dataclasses import dataclass
+from itertools import accumulate
 import logging
 import random
-from typing import Sequence
+from typing import Optional, Sequence
 
 MIN_LETTERS = 3
 MAX_LETTERS = 6
@@ -20,6 +22,28 @@ FREQUENCIES = ENGLISH_LETTER_FREQUENCIES
 
 BAG_SIZE = sum(FREQUENCIES.values())
 
+# A multiset of letters packed into one int: a 5 bit lane per letter A-Z whose
+# top bit is a guard, so lanes hold counts up to 15 and a sub-multiset test is
+# an OR, a subtract and an AND over all 26 letters at once.
+_LANE_BITS = 5
+_GUARD_BITS = sum(1 << (lane*_LANE_BITS + _LANE_BITS - 1) for lane in range(26))
+
+def letter_counts(letters: str) -> int:
+    counts = 0
+    for letter in letters:
+        lane = ord(letter) - ord('A')
+        if 0 <= lane < 26:
+            counts += 1 << (lane*_LANE_BITS)
+    return counts
+
+def missing_counts(word_counts: int, rack_counts: int) -> int:
+    # Borrowing from a lane's guard bit means the word needs more of that
+    # letter than the rack has; returns those guard bits (0: word fits).
+    return ~((rack_counts | _GUARD_BITS) - word_counts) & _GUARD_BITS
+
+def _is_missing(missing: int, letter: str) -> bool:
+    return bool(missing >> ((ord(letter) - ord('A'))*_LANE_BITS + _LANE_BITS - 1) & 1)
+
 @dataclass(unsafe_hash=True)
 class Tile:
     # Class to track the cubes. Unlike Scrabble, a "tile"'s letter is mutable.
@@ -30,11 +54,57 @@ class Tile:
 def _tiles_to_letters(tiles: Sequence[Tile]):
     return ''.join([t.letter for t in tiles])
 
+class LetterBag:
+    # Draws next letters from FREQUENCIES with BAG_SIZE/MAX_LETTERS units taken
+    # out for each letter already on the rack. Per-letter weights are updated
+    # as rack letters change and the cumulative table is rebuilt lazily, so a
+    # draw is one bisect rather than building a list of the whole bag.
+
+    def __init__(self, rack_letters: str = "", seed: Optional[int] = None) -> None:
+        # Without a seed, draws come from the module-level random generator.
+        self._random = random.Random(seed).random if seed is not None else random.random
+        self._letters = sorted(FREQUENCIES)
+        self._positions = {letter: ix for ix, letter in enumerate(self._letters)}
+        self._weights = [0] * len(self._letters)
+        self._cumulative: list[int] = []
+        self.set_rack(rack_letters)
+
+    def _update_weight(self, letter: str) -> None:
+        if letter in self._positions:
+            self._weights[self._positions[letter]] = max(0,
+                FREQUENCIES[letter] - self._rack_counts[letter]*int(BAG_SIZE / MAX_LETTERS))
+            self._cumulative = []
+
+    def set_rack(self, rack_letters: str) -> None:
+        self._rack_counts = Counter(rack_letters)
+        for letter in self._letters:
+            self._update_weight(letter)
+
+    def replace(self, old_letter: str, new_letter: str) -> None:
+        self._rack_counts[old_letter] -= 1
+        self._rack_counts[new_letter] += 1
+        self._update_weight(old_letter)
+        self._update_weight(new_letter)
+
+    def weights(self) -> dict[str, int]:
+        return dict(zip(self._letters, self._weights))
+
+    def draw(self) -> str:
+        if not self._cumulative:
+            self._cumulative = list(accumulate(self._weights))
+        total = self._cumulative[-1]
+        if not total:
+            return self._letters[int(self._random() * len(self._letters))]
+        return self._letters[bisect.bisect_right(self._cumulative, self._random() * total)]
+
 class Rack:
-    def __init__(self, letters: str) -> None:
+    def __init__(self, letters: str, bag: Optional[LetterBag] = None) -> None:
         self._tiles = []
         for count, letter in enumerate(letters):
             self._tiles.append(Tile(letter, str(count)))
+        self._index_tiles()
+        self._bag = bag or LetterBag()
+        self._bag.set_rack(letters)
         self._last_guess: list[Tile]  = []
         self._next_letter = self.gen_next_letter()
 
@@ -42,31 +112,46 @@ class Rack:
         return (f"TILES: {self._tiles}\n" +
             f"LAST_GUESS: {self._last_guess}")
 
+    def _index_tiles(self) -> None:
+        # Lookups run on every cube NFC event, so keep tiles indexed by id and
+        # by letter (in rack order) rather than scanning the rack each time.
+        self._tiles_by_id = {t.id: t for t in self._tiles}
+        self._positions_by_letter: dict[str, list[int]] = defaultdict(list)
+        for position, tile in enumerate(self._tiles):
+            self._positions_by_letter[tile.letter].append(position)
+        self._used: dict[str, int] = {}
+        self._counts = letter_counts(self.letters())
+
     def get_tiles(self) -> list[Tile]:
         return self._tiles
 
     def set_tiles(self, tiles: list[Tile]) -> None:
         self._tiles = tiles
+        self._index_tiles()
+        self._bag.set_rack(self.letters())
 
-    def last_guess(self) -> None:
+    def last_guess(self) -> str:
         return _tiles_to_letters(self._last_guess)
 
-    def letters_to_ids(self, letters: str) -> list[str]:
-        ids: list[str]  = []
-        tiles = self._tiles.copy()
+    def _letters_to_tiles(self, letters: str) -> list[Tile]:
+        # The first unused tile (in rack order) for each letter; letters not
+        # in the rack are skipped.
+        tiles = []
+        used = self._used
+        used.clear()
         for letter in letters:
-            for tile in tiles:
-                if tile.letter == letter:
-                    tiles.remove(tile)
-                    ids += tile.id
-                    break
-        return ids
+            positions = self._positions_by_letter.get(letter)
+            count = used.get(letter, 0)
+            if positions and count < len(positions):
+                tiles.append(self._tiles[positions[count]])
+                used[letter] = count + 1
+        return tiles
+
+    def letters_to_ids(self, letters: str) -> list[str]:
+        return [t.id for t in self._letters_to_tiles(letters)]
 
     def ids_to_tiles(self, ids: list[str]) -> list[Tile]:
-        tiles = []
-        for an_id in ids:
-            tiles.append(next(t for t in self._tiles if t.id == an_id))
-        return tiles
+        return [self._tiles_by_id[an_id] for an_id in ids]
 
     def ids_to_letters(self, ids: list[str]) -> str:
         return ''.join([t.letter for t in self.ids_to_tiles(ids)])
@@ -74,25 +159,19 @@ class Rack:
     def guess(self, guess: str) -> None:
         # Assumes all the letters of guess are in the rack.
 
-        guess_letters = list(guess)
-        self._last_guess = []
-        unused_tiles = list(self._tiles)
-        for guess_letter in guess_letters:
-            for tile in unused_tiles:
-                if guess_letter == tile.letter:
-                    self._last_guess.append(tile)
-                    unused_tiles.remove(tile)
-                    break
+        self._last_guess = self._letters_to_tiles(guess)
 
         logging.info(f"guess({guess})")
 
+    def counts(self) -> int:
+        # The rack's letters as a letter_counts() vector.
+        return self._counts
+
     def missing_letters(self, word: str) -> str:
-        rack_hash = Counter(_tiles_to_letters(self._tiles))
-        word_hash = Counter(word)
-        if all(word_hash[letter] <= rack_hash[letter] for letter in word):
+        missing = missing_counts(letter_counts(word), self._counts)
+        if not missing:
             return ""
-        else:
-            return "".join([l for l in word_hash if word_hash[l] > rack_hash[l]])
+        return "".join([l for l in dict.fromkeys(word) if _is_missing(missing, l)])
 
     def letters(self) -> str:
         return ''.join([l.letter for l in self._tiles])
@@ -101,20 +180,19 @@ class Rack:
         return self._next_letter
 
     def gen_next_letter(self) -> str:
-        c = Counter(''.join([l.letter for l in self._tiles]))
-        for k in c.keys():
-            c[k] *= int(BAG_SIZE / MAX_LETTERS)
-        frequencies = Counter(FREQUENCIES) # make a copy
-        frequencies.subtract(c)
-
-        bag = [letter for letter, frequency in frequencies.items() for _ in range(frequency)]
-        return random.choice(bag)
+        return self._bag.draw()
 
     def replace_letter(self, new_letter: str, position: int) -> Tile:
         logging.info(f"\nreplace_letter() {new_letter} -> {str(self)}, new_letter: {new_letter}")
         remove_tile = self._tiles[position]
 
+        old_letter = remove_tile.letter
+        self._bag.replace(old_letter, new_letter)
         remove_tile.letter = new_letter
+        # Only the old and new letters' entries change.
+        self._positions_by_letter[old_letter].remove(position)
+        bisect.insort(self._positions_by_letter[new_letter], position)
+        self._counts += letter_counts(new_letter) - letter_counts(old_letter)
         self._next_letter = self.gen_next_letter()
         logging.info(f"final: {str(self)}")
         return remove_tile
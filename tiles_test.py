@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import collections
 import random
 import unittest
 
@@ -26,5 +27,84 @@ class TestRack(unittest.TestCase):
         rack = tiles.Rack("FRIENDS")
         self.assertEqual('END', rack.ids_to_letters(list("345")))
 
+    def test_lookups_follow_set_tiles(self) -> None:
+        rack = tiles.Rack("ABCABC")
+        rack.set_tiles(rack.ids_to_tiles(list("543210")))
+        self.assertEqual("CBACBA", rack.letters())
+        self.assertEqual(['5', '2', '4'], rack.letters_to_ids("CCB"))
+
+    def test_lookups_follow_replace_letter(self) -> None:
+        rack = tiles.Rack("FRIENDS")
+        rack.replace_letter("S", 0)
+        self.assertEqual(['0', '6'], rack.letters_to_ids("SS"))
+        self.assertEqual([], rack.letters_to_ids("F"))
+        self.assertEqual("S", rack.ids_to_letters(['0']))
+
+    def test_replace_letter_keeps_index(self) -> None:
+        rack = tiles.Rack("FRIENDS")
+        for _ in range(200):
+            rack.replace_letter(random.choice("DEFINRSZ"), random.randrange(7))
+            letters = rack.letters()
+            rebuilt = tiles.Rack(letters)
+            self.assertEqual(rebuilt.letters_to_ids(letters), rack.letters_to_ids(letters))
+            self.assertEqual(tiles.letter_counts(letters), rack.counts())
+
+    def test_missing_letters(self) -> None:
+        rack = tiles.Rack("FRIENDS")
+        self.assertEqual("", rack.missing_letters("FIND"))
+        self.assertEqual("", rack.missing_letters("FRIENDS"))
+        self.assertEqual("ZE", rack.missing_letters("ZEE"))
+        self.assertEqual("O", rack.missing_letters("FOOD"))
+        rack.replace_letter("O", 0)
+        self.assertEqual("FO", rack.missing_letters("FOOD"))
+        self.assertEqual("", rack.missing_letters("NOD"))
+
+    def test_letter_counts(self) -> None:
+        self.assertEqual(tiles.letter_counts("BANANA"), tiles.letter_counts("NANABA"))
+        self.assertEqual(0, tiles.missing_counts(tiles.letter_counts("BAN"), tiles.letter_counts("BANANA")))
+        self.assertEqual(0, tiles.missing_counts(0, tiles.letter_counts("??????")))
+        self.assertNotEqual(0, tiles.missing_counts(tiles.letter_counts("ZZ"), tiles.letter_counts("Z" + "A"*15)))
+        self.assertEqual(0, tiles.missing_counts(tiles.letter_counts("Z"*15), tiles.letter_counts("Z"*15)))
+
+    def test_guess(self) -> None:
+        rack = tiles.Rack("ABCABC")
+        rack.guess("CAB")
+        self.assertEqual("CAB", rack.last_guess())
+        self.assertEqual(['2', '0', '1'], [t.id for t in rack._last_guess])
+
+class TestLetterBag(unittest.TestCase):
+    def setUp(self):
+        tiles.MAX_LETTERS = 6
+
+    def test_seeded_draws_are_reproducible(self) -> None:
+        draws = [tiles.LetterBag("SEARCH", seed=3).draw() for _ in range(2)]
+        self.assertEqual(draws[0], draws[1])
+        bag_1 = tiles.LetterBag("SEARCH", seed=3)
+        bag_2 = tiles.LetterBag("SEARCH", seed=3)
+        self.assertEqual([bag_1.draw() for _ in range(100)], [bag_2.draw() for _ in range(100)])
+
+    def test_rack_letters_are_taken_out(self) -> None:
+        bag = tiles.LetterBag("EEEEEE", seed=1)
+        self.assertEqual(0, bag.weights()['E'])
+        self.assertEqual(tiles.FREQUENCIES['A'], bag.weights()['A'])
+        self.assertNotIn('E', set(bag.draw() for _ in range(1000)))
+
+    def test_replace(self) -> None:
+        bag = tiles.LetterBag("AAAAAA", seed=1)
+        bag.replace('A', 'E')
+        self.assertEqual(tiles.LetterBag("AAAAAE").weights(), bag.weights())
+
+    def test_distribution(self) -> None:
+        bag = tiles.LetterBag("", seed=1)
+        counts = collections.Counter(bag.draw() for _ in range(tiles.BAG_SIZE * 100))
+        for letter, frequency in tiles.FREQUENCIES.items():
+            self.assertAlmostEqual(frequency * 100, counts[letter], delta=frequency * 100 * 0.3 + 30)
+
+    def test_rack_uses_bag(self) -> None:
+        rack = tiles.Rack("ZZZZZZ", tiles.LetterBag(seed=5))
+        rack.replace_letter("E", 0)
+        self.assertEqual(tiles.LetterBag("EZZZZZ").weights(), rack._bag.weights())
+        self.assertIn(rack.next_letter(), tiles.FREQUENCIES)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,59 @@
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Handlers get the message and its topic split into levels.
+Handler = Callable[[Any, list[str]], Awaitable[None]]
+
+class _Node:
+    __slots__ = ("children", "handler", "multi_level")
+
+    def __init__(self) -> None:
+        self.children: dict[str, "_Node"] = {}
+        self.handler: Optional[Handler] = None
+        self.multi_level: Optional[Handler] = None  # handler of a trailing "#"
+
+class TopicRouter:
+    # Trie over topic levels, so finding a message's handler costs one dict
+    # lookup per level however many topic filters are registered. Filters use
+    # MQTT wildcards: "+" matches one level, a trailing "#" any remaining ones.
+    def __init__(self) -> None:
+        self._root = _Node()
+
+    def add(self, topic_filter: str, handler: Handler) -> None:
+        node = self._root
+        levels = topic_filter.split("/")
+        for ix, level in enumerate(levels):
+            if level == "#":
+                if ix != len(levels) - 1:
+                    raise ValueError(f"'#' must be the last level of {topic_filter}")
+                node.multi_level = handler
+                return
+            node = node.children.setdefault(level, _Node())
+        node.handler = handler
+
+    def route(self, topic: str) -> tuple[Optional[Handler], list[str]]:
+        levels = topic.split("/")
+        return self._match(self._root, levels, 0), levels
+
+    def _match(self, node: _Node, levels: list[str], ix: int) -> Optional[Handler]:
+        # Exact levels win over "+", which wins over "#".
+        if ix == len(levels):
+            return node.handler or node.multi_level
+        for key in (levels[ix], "+"):
+            child = node.children.get(key)
+            if child:
+                handler = self._match(child, levels, ix + 1)
+                if handler:
+                    return handler
+        return node.multi_level
+
+    async def dispatch(self, message: Any) -> bool:
+        # Returns whether a handler took the message.
+        handler, levels = self.route(message.topic.value)
+        if handler is None:
+            logger.debug("no route for %s", message.topic)
+            return False
+        await handler(message, levels)
+        return True
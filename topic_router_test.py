@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+import aiomqtt
+import unittest
+from unittest import IsolatedAsyncioTestCase
+
+from topic_router import TopicRouter
+
+class Message:
+    def __init__(self, topic: str) -> None:
+        self.topic = aiomqtt.Topic(topic)
+
+class TestTopicRouter(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.router = TopicRouter()
+        self.calls: list[tuple[str, list[str]]] = []
+        for topic_filter in ["cube/nfc/+", "cube/+/letter", "app/start", "app/#", "game/#"]:
+            self.router.add(topic_filter, self.handler(topic_filter))
+
+    def handler(self, name: str):
+        async def handle(message: Message, levels: list[str]) -> None:
+            self.calls.append((name, levels))
+        return handle
+
+    async def test_exact(self) -> None:
+        self.assertTrue(await self.router.dispatch(Message("app/start")))
+        self.assertEqual([("app/start", ["app", "start"])], self.calls)
+
+    async def test_single_level_wildcard(self) -> None:
+        await self.router.dispatch(Message("cube/nfc/BLOCK_0"))
+        await self.router.dispatch(Message("cube/BLOCK_0/letter"))
+        self.assertEqual(["cube/nfc/+", "cube/+/letter"], [name for name, _ in self.calls])
+        self.assertEqual("BLOCK_0", self.calls[0][1][2])
+
+    async def test_multi_level_wildcard(self) -> None:
+        await self.router.dispatch(Message("app/abort"))
+        await self.router.dispatch(Message("app"))
+        await self.router.dispatch(Message("game/nfc/BLOCK_0"))
+        self.assertEqual(["app/#", "app/#", "game/#"], [name for name, _ in self.calls])
+
+    async def test_no_route(self) -> None:
+        self.assertFalse(await self.router.dispatch(Message("cube/nfc")))
+        self.assertFalse(await self.router.dispatch(Message("cube/nfc/BLOCK_0/extra")))
+        self.assertEqual([], self.calls)
+
+    def test_hash_must_be_last(self) -> None:
+        with self.assertRaises(ValueError):
+            self.router.add("a/#/b", self.handler("bad"))
+
+if __name__ == '__main__':
+    unittest.main()
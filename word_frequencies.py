@@ -0,0 +1,44 @@
+from array import array
+from operator import itemgetter
+from typing import Callable, Iterable, TextIO
+
+# Word usage counts (words.txt) stored as columns: word_ids[i] has counts[i]
+# uses, sorted by id. A dense int32 column indexed by dictionary word id backs
+# lookups, so a batch of ids is one C-level gather instead of a dict hit each.
+
+class WordFrequencies:
+    def __init__(self, word_ids: Iterable[int], counts: Iterable[int], size: int) -> None:
+        rows = sorted(zip(word_ids, counts))
+        self.word_ids = array("i", [word_id for word_id, _ in rows])
+        self.counts = array("i", [count for _, count in rows])
+        self._counts_by_id = array("i", [0]) * size
+        for word_id, count in rows:
+            self._counts_by_id[word_id] = count
+
+    @staticmethod
+    def read(f: TextIO, word_id: Callable[[str], int], size: int) -> "WordFrequencies":
+        # Lines are "count word". Words the dictionary doesn't know are dropped.
+        word_ids = []
+        counts = []
+        for line in f:
+            fields = line.split()
+            if len(fields) != 2:
+                continue
+            an_id = word_id(fields[1].upper())
+            if an_id >= 0:
+                word_ids.append(an_id)
+                counts.append(min(int(fields[0]), 2**31 - 1))
+        return WordFrequencies(word_ids, counts, size)
+
+    def __len__(self) -> int:
+        return len(self.word_ids)
+
+    def count(self, word_id: int) -> int:
+        return self._counts_by_id[word_id] if 0 <= word_id < len(self._counts_by_id) else 0
+
+    def counts_for(self, word_ids: list[int]) -> list[int]:
+        if any(not 0 <= word_id < len(self._counts_by_id) for word_id in word_ids):
+            return [self.count(word_id) for word_id in word_ids]
+        if len(word_ids) < 2:
+            return [self._counts_by_id[word_id] for word_id in word_ids]
+        return list(itemgetter(*word_ids)(self._counts_by_id))
@@ -0,0 +1,194 @@
+from array import array
+from collections import Counter
+from typing import Iterable, Iterator, Optional
+
+# Directed acyclic word graph (minimized trie) flattened into arrays, so the
+# whole SOWPODS 3-6 letter list costs a few hundred KB instead of a Python set.
+# Node n's outgoing edges are _labels[_first_edge[n]:_first_edge[n+1]] (sorted
+# letters, one byte each) leading to the nodes in the same slice of _targets.
+
+class _BuildNode:
+    __slots__ = ("final", "edges")
+
+    def __init__(self) -> None:
+        self.final = False
+        self.edges: dict[str, "_BuildNode"] = {}
+
+    def key(self) -> tuple:
+        return (self.final, tuple((letter, id(child)) for letter, child in sorted(self.edges.items())))
+
+def _build(sorted_words: Iterable[str]) -> _BuildNode:
+    # Incremental construction of a minimal automaton from sorted input
+    # (Daciuk et al. 2000): suffixes are merged as soon as no later word can
+    # extend them, so the full trie never exists in memory.
+    root = _BuildNode()
+    unchecked: list[tuple[_BuildNode, str, _BuildNode]] = []
+    minimized: dict[tuple, _BuildNode] = {}
+
+    def minimize(down_to: int) -> None:
+        while len(unchecked) > down_to:
+            parent, letter, child = unchecked.pop()
+            key = child.key()
+            if key in minimized:
+                parent.edges[letter] = minimized[key]
+            else:
+                minimized[key] = child
+
+    previous_word = ""
+    for word in sorted_words:
+        if word == previous_word:
+            continue
+        common = 0
+        while common < min(len(word), len(previous_word)) and word[common] == previous_word[common]:
+            common += 1
+        minimize(common)
+
+        node = unchecked[-1][2] if unchecked else root
+        for letter in word[common:]:
+            child = _BuildNode()
+            node.edges[letter] = child
+            unchecked.append((node, letter, child))
+            node = child
+        node.final = True
+        previous_word = word
+    minimize(0)
+    return root
+
+class WordGraph:
+    ROOT = 0
+
+    def __init__(self, words: Iterable[str]) -> None:
+        root = _build(sorted(words))
+
+        # Number the nodes breadth first so the root is 0.
+        node_ids: dict[int, int] = {id(root): 0}
+        nodes = [root]
+        for node in nodes:
+            for _, child in sorted(node.edges.items()):
+                if id(child) not in node_ids:
+                    node_ids[id(child)] = len(nodes)
+                    nodes.append(child)
+
+        self._final = bytearray(len(nodes))
+        self._first_edge = array("I", [0])
+        labels = bytearray()
+        self._targets = array("I")
+        for ix, node in enumerate(nodes):
+            self._final[ix] = node.final
+            for letter, child in sorted(node.edges.items()):
+                labels += letter.encode("ascii")
+                self._targets.append(node_ids[id(child)])
+            self._first_edge.append(len(labels))
+        self._labels = bytes(labels)
+
+        # Words reachable from each node, for numbering words alphabetically.
+        self._word_counts = array("I", [0]) * len(nodes)
+        counted = bytearray(len(nodes))
+
+        def count_words(node: int) -> int:
+            if not counted[node]:
+                self._word_counts[node] = self._final[node] + sum(count_words(self._targets[e])
+                    for e in range(self._first_edge[node], self._first_edge[node + 1]))
+                counted[node] = 1
+            return self._word_counts[node]
+
+        self._word_count = count_words(self.ROOT)
+
+    def node_count(self) -> int:
+        return len(self._final)
+
+    def edge_count(self) -> int:
+        return len(self._targets)
+
+    def _child(self, node: int, letter: int) -> Optional[int]:
+        ix = self._labels.find(letter, self._first_edge[node], self._first_edge[node + 1])
+        return None if ix < 0 else self._targets[ix]
+
+    def _walk(self, prefix: str) -> Optional[int]:
+        node = self.ROOT
+        for letter in prefix.encode("ascii", "replace"):
+            child = self._child(node, letter)
+            if child is None:
+                return None
+            node = child
+        return node
+
+    def __len__(self) -> int:
+        return self._word_count
+
+    def __contains__(self, word: object) -> bool:
+        if not isinstance(word, str):
+            return False
+        node = self._walk(word)
+        return node is not None and bool(self._final[node])
+
+    def word_id(self, word: str) -> int:
+        # Alphabetical position of word, or -1: count every word that sorts
+        # before it while walking its path.
+        node = self.ROOT
+        word_id = 0
+        for letter in word.encode("ascii", "replace"):
+            word_id += self._final[node]
+            ix = self._labels.find(letter, self._first_edge[node], self._first_edge[node + 1])
+            if ix < 0:
+                return -1
+            for earlier in range(self._first_edge[node], ix):
+                word_id += self._word_counts[self._targets[earlier]]
+            node = self._targets[ix]
+        return word_id if self._final[node] else -1
+
+    def has_prefix(self, prefix: str) -> bool:
+        return self._walk(prefix) is not None
+
+    def _words_from(self, node: int, prefix: str) -> Iterator[str]:
+        if self._final[node]:
+            yield prefix
+        for ix in range(self._first_edge[node], self._first_edge[node + 1]):
+            yield from self._words_from(self._targets[ix], prefix + chr(self._labels[ix]))
+
+    def __iter__(self) -> Iterator[str]:
+        return self._words_from(self.ROOT, "")
+
+    def words_with_prefix(self, prefix: str) -> Iterator[str]:
+        node = self._walk(prefix)
+        if node is None:
+            return iter(())
+        return self._words_from(node, prefix)
+
+    def words_from_letters(self, letters: str, min_length: int) -> list[str]:
+        # Every word of at least min_length spelled from a sub-multiset of
+        # letters, found in one walk instead of one lookup per sub-multiset.
+        remaining = Counter(letters.encode("ascii", "replace"))
+        words: list[str] = []
+
+        def search(node: int, prefix: str) -> None:
+            if self._final[node] and len(prefix) >= min_length:
+                words.append(prefix)
+            for ix in range(self._first_edge[node], self._first_edge[node + 1]):
+                letter = self._labels[ix]
+                if remaining[letter]:
+                    remaining[letter] -= 1
+                    search(self._targets[ix], prefix + chr(letter))
+                    remaining[letter] += 1
+
+        search(self.ROOT, "")
+        return words
+
+    def words_for_signature(self, signature: str) -> list[str]:
+        remaining = Counter(signature.encode("ascii", "replace"))
+        words: list[str] = []
+
+        def search(node: int, prefix: str, letters_left: int) -> None:
+            if not letters_left:
+                if self._final[node]:
+                    words.append(prefix)
+                return
+            for ix in range(self._first_edge[node], self._first_edge[node + 1]):
+                letter = self._labels[ix]
+                if remaining[letter]:
+                    remaining[letter] -= 1
+                    search(self._targets[ix], prefix + chr(letter), letters_left - 1)
+                    remaining[letter] += 1
+
+        search(self.ROOT, "", len(signature))
+        return words
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+import unittest
+
+from word_graph import WordGraph
+
+class TestWordGraph(unittest.TestCase):
+    def setUp(self) -> None:
+        self.words = ["ARCH", "ARCHES", "FUZZ", "LINE", "LINES", "ONLINE", "SEARCH", "TEACH"]
+        self.graph = WordGraph(reversed(self.words))
+
+    def test_is_word(self) -> None:
+        for word in self.words:
+            self.assertIn(word, self.graph)
+        self.assertNotIn("ARC", self.graph)
+        self.assertNotIn("ARCHESS", self.graph)
+        self.assertNotIn("", self.graph)
+        self.assertNotIn("ÄRCH", self.graph)
+
+    def test_has_prefix(self) -> None:
+        self.assertTrue(self.graph.has_prefix(""))
+        self.assertTrue(self.graph.has_prefix("AR"))
+        self.assertTrue(self.graph.has_prefix("ONLINE"))
+        self.assertFalse(self.graph.has_prefix("ONLINES"))
+        self.assertFalse(self.graph.has_prefix("Q"))
+
+    def test_enumerate(self) -> None:
+        self.assertEqual(sorted(self.words), list(self.graph))
+        self.assertEqual(len(self.words), len(self.graph))
+        self.assertEqual(["LINE", "LINES"], list(self.graph.words_with_prefix("LIN")))
+        self.assertEqual([], list(self.graph.words_with_prefix("X")))
+
+    def test_shares_suffixes(self) -> None:
+        # ARCH/SEARCH/TEACH share "CH", LINE/ONLINE share "LINE": a trie would
+        # need one node per letter of every distinct prefix.
+        trie_nodes = 1 + len({word[:i] for word in self.words for i in range(1, len(word) + 1)})
+        self.assertLess(self.graph.node_count(), trie_nodes)
+
+    def test_words_for_signature(self) -> None:
+        self.assertEqual(["ARCH"], self.graph.words_for_signature("ACHR"))
+        self.assertEqual(["FUZZ"], self.graph.words_for_signature("FUZZ"))
+        self.assertEqual([], self.graph.words_for_signature("FUZ"))
+
+    def test_words_from_letters(self) -> None:
+        self.assertEqual(["ARCH", "ARCHES", "SEARCH"], self.graph.words_from_letters("SEARCHX", 3))
+        self.assertEqual(["ARCH"], self.graph.words_from_letters("HCRA", 3))
+        self.assertEqual([], self.graph.words_from_letters("HCRA", 5))
+
+    def test_word_id(self) -> None:
+        self.assertEqual(list(range(len(self.words))), [self.graph.word_id(w) for w in sorted(self.words)])
+        self.assertEqual(-1, self.graph.word_id("ARC"))
+        self.assertEqual(-1, self.graph.word_id("ZEBRA"))
+
+    def test_duplicates(self) -> None:
+        self.assertEqual(["AB"], list(WordGraph(["AB", "AB"])))
+
+if __name__ == '__main__':
+    unittest.main()